@@ -0,0 +1,112 @@
+import java.util.ArrayList;
+import java.util.HashSet;
+import java.util.List;
+import java.util.Set;
+
+import junit.runner.Version;
+import org.junit.internal.TextListener;
+import org.junit.runner.Description;
+import org.junit.runner.Request;
+import org.junit.runner.Result;
+import org.junit.runner.Runner;
+import org.junit.runner.manipulation.Filter;
+import org.junit.runner.notification.Failure;
+import org.junit.runner.notification.RunListener;
+import org.junit.runner.notification.RunNotifier;
+import org.junit.runner.notification.StoppedByUserException;
+import org.junit.runners.Suite;
+
+/**
+ * Runs a JUnit testsuite for the screening runs of ARC (See tester.py).
+ *
+ * Usage: java ArcTestRunner TestSuite [method(Class) ...]
+ *
+ * The listed test methods (the ones that failed most often so far) are run
+ * first, followed by the rest of the testsuite, as one run. The run stops at
+ * the first failing test. The output is JUnitCore's own (TextListener) and
+ * the exit code is JUnitCore's, so tester.py reads it the same way.
+ *
+ * Compiled by tester.compile_screening_runner when ARC starts.
+ */
+public class ArcTestRunner {
+
+  public static void main(String[] args) throws Exception {
+    System.out.println("JUnit version " + Version.id());
+
+    List<Runner> runners = new ArrayList<Runner>();
+
+    // Run the listed test methods first. Skip the ones that are no longer
+    // part of the testsuite.
+    final Set<String> runFirst = new HashSet<String>();
+    for (int i = 1; i < args.length; i++) {
+      String name = args[i];
+      int open = name.indexOf('(');
+      if (open < 0 || !name.endsWith(")")) {
+        continue;
+      }
+
+      String methodName = name.substring(0, open);
+      Class<?> testClass;
+      try {
+        testClass = Class.forName(name.substring(open + 1, name.length() - 1));
+        testClass.getMethod(methodName);
+      } catch (ClassNotFoundException e) {
+        continue;
+      } catch (NoSuchMethodException e) {
+        continue;
+      }
+
+      if (runFirst.add(name)) {
+        runners.add(Request.method(testClass, methodName).getRunner());
+      }
+    }
+
+    // Then the rest of the testsuite
+    Filter notRunFirst = new Filter() {
+      public boolean shouldRun(Description description) {
+        if (description.isTest()) {
+          return !runFirst.contains(description.getDisplayName());
+        }
+        for (Description child : description.getChildren()) {
+          if (shouldRun(child)) {
+            return true;
+          }
+        }
+        return false;
+      }
+
+      public String describe() {
+        return "tests not run first";
+      }
+    };
+
+    Request suite = Request.aClass(Class.forName(args[0]));
+    if (notRunFirst.shouldRun(suite.getRunner().getDescription())) {
+      runners.add(suite.filterWith(notRunFirst).getRunner());
+    }
+
+    // One run, reported the way JUnitCore.main reports it
+    Runner runner = new Suite((Class<?>) null, runners) {};
+    final RunNotifier notifier = new RunNotifier();
+    Result result = new Result();
+    notifier.addFirstListener(result.createListener());
+    notifier.addListener(new TextListener(System.out));
+
+    // Stop at the first failing test
+    notifier.addListener(new RunListener() {
+      public void testFailure(Failure failure) {
+        notifier.pleaseStop();
+      }
+    });
+
+    notifier.fireTestRunStarted(runner.getDescription());
+    try {
+      runner.run(notifier);
+    } catch (StoppedByUserException e) {
+      // The next test was about to start after a failure
+    }
+    notifier.fireTestRunFinished(result);
+
+    System.exit(result.wasSuccessful() ? 0 : 1);
+  }
+}
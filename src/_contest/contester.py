@@ -11,10 +11,15 @@ Copyright David Kelk and Kevin Jalbert, 2012
 import sys
 import subprocess
 import tester
+import runtimes
 import os
-import timeit
+import json
+import time
+import hashlib
+import socket
 import tempfile
 import fileinput
+from _evolution import hashlist
 
 sys.path.append("..")  # To allow importing parent directory module
 import config
@@ -95,15 +100,79 @@ def _check_tools():
   return True
 
 def run_test_execution(runs):
-  # Check if the testsuite can successfully execute with the set parameters
-  logger.debug("Practice test suite run {} times".format(runs))
-  cmd = "test_execution({})".format(runs)
-  timer = timeit.Timer(cmd, "from _contest.contester import test_execution")
+  """Find the average execution time of the testsuite with ConTest.
 
-  averageTime = timer.timeit(1) / runs
+  The practice runs are made one at a time, as runs sharing the machine are
+  slower, and their times are the baseline of the timeouts (See
+  runtimes.py). They are cached in config._CACHE_DIR, keyed by the compiled
+  (pristine) project in the work area, the test configuration and the
+  machine. When ARC is started again on an unchanged project, no practice
+  runs are made. Only the config._CONTEST_CALIBRATION_MAX_ENTRIES most
+  recently used projects are kept.
+
+  Args:
+    runs (int): the number of practice runs
+
+  Returns:
+    float: average execution time in seconds
+  """
+
+  cacheFile = os.path.join(config._CACHE_DIR, 'calibration.json')
+  key = get_calibration_key(runs)
+
+  calibrations = {}
+  if os.path.exists(cacheFile):
+    with open(cacheFile) as f:
+      calibrations = json.load(f)
+
+  if key in calibrations:
+    logger.debug("Reusing the practice test suite runs of an identical project")
+    runTimes, goodRuns = calibrations[key][:2]
+  else:
+    # Check if the testsuite can successfully execute with the set parameters
+    logger.debug("Practice test suite run {} times".format(runs))
+    runTimes, goodRuns = test_execution(runs)
+
+  # Keep the most recently used calibrations
+  calibrations[key] = (runTimes, goodRuns, time.time())
+  for oldKey in sorted(calibrations, key=lambda k: calibrations[k][2:3],
+                       reverse=True)[config._CONTEST_CALIBRATION_MAX_ENTRIES:]:
+    del calibrations[oldKey]
+
+  if not os.path.exists(config._CACHE_DIR):
+    os.makedirs(config._CACHE_DIR)
+  with open(cacheFile, 'w') as f:
+    json.dump(calibrations, f)
+
+  # The timeouts of the functional runs start from them, however many runs are
+  # made at once (See runtimes.py)
+  runtimes.seed_run_times(True, [t for t, good in zip(runTimes, goodRuns) if good])
+
+  averageTime = sum(runTimes, 0.0) / len(runTimes)
   logger.debug("Practice test suite runs took on average {}s".format(averageTime))
   return averageTime
 
+def get_calibration_key(runs):
+  """Hash the compiled project in the work area, the test configuration and
+  the machine.
+
+  Args:
+    runs (int): the number of practice runs
+
+  Returns:
+    string: key of the practice runs in the cache
+  """
+
+  SHAhash = hashlib.sha1()
+  SHAhash.update(repr(hashlist.hash_directory(config._PROJECT_CLASS_DIR)))
+  SHAhash.update(repr((runs, config._PROJECT_TESTSUITE, config._PROJECT_CLASSPATH,
+    config._JUNIT_JAR, config._CONTEST_JAR, config._PROJECT_TEST_MB,
+    socket.gethostname())))
+  if os.path.exists(config._CONTEST_KINGPROPERTY):
+    SHAhash.update(hashlist.hash_file(config._CONTEST_KINGPROPERTY))
+
+  return SHAhash.hexdigest()
+
 def test_execution(runs):
   """Test the testsuite to ensure it can run successfully at least once.
 
@@ -112,11 +181,17 @@ def test_execution(runs):
 
   Args:
     runs (int): the number of runs the testsuite will be tested for
+
+  Returns:
+    ([float], [bool]): execution time of each run, and if it was successful
   """
 
   testRunner = tester.Tester()
   try:
-    testRunner.begin_testing(True, False, runs=runs)
+    # One at a time, the runs are timed
+    testRunner.begin_testing(True, False, runs=runs, parallel=False)
+    runTimes = testRunner.runTimes[:]
+    goodRuns = testRunner.goodRuns[:]
 
     #logger.info("Testing Runs Results...")
     #logger.info("Successes: {}".format(testRunner.successes))
@@ -138,10 +213,16 @@ def test_execution(runs):
     else:
       logger.warn("The test suite wasn't executed successfully")
 
+    # The results are shared by all Testers (goodRuns, ...). Don't let these
+    # runs count towards the first evaluation.
+    testRunner.clear_results()
+
   except Exception as message:
     print (message.args)
     sys.exit()
 
+  return runTimes, goodRuns
+
 
 def run_contest():
   """Run the testsuite with ConTest using the approach in tester.py."""
@@ -0,0 +1,214 @@
+"""Keep track of how long the testsuite takes to run.
+
+The execution times of the successful test runs are summarized by a streaming
+quantile estimate for the project. The timeout of a test run is derived from
+it, instead of waiting the fixed config._CONTEST_TIMEOUT_SEC on every run that
+deadlocks or hangs. The estimates are kept for the whole ARC run, so they
+carry over from one generation to the next.
+
+Runs are slower when several of them share the machine, so there is an
+estimate for each number of concurrent runs. Each of them starts from the
+practice runs made one at a time at startup (See seed_run_times).
+
+Only the runs that finish are recorded. A run that times out is usually a
+deadlock or a hang, and recording it at its timeout would push the quantile up
+to the timeout, which the safety factor then multiplies again: a few percent
+of hung runs would bring back the fixed config._CONTEST_TIMEOUT_SEC.
+"""
+
+from __future__ import division
+import sys
+
+sys.path.append("..")  # To allow importing parent directory module
+import config
+
+import logging
+logger = logging.getLogger('output-log')
+
+
+class QuantileEstimator():
+  """Streaming estimate of a quantile using the P-square algorithm.
+
+  The P-square algorithm (Jain and Chlamtac, 1985) keeps five markers whose
+  heights track the minimum, the p/2, p and (1+p)/2 quantiles and the maximum
+  of the values seen so far. Memory and time per value are constant.
+
+  Attributes:
+    quantile (float): the quantile being estimated, eg: 0.99
+    count (int): number of values seen
+    heights ([float]): marker heights
+    positions ([float]): actual marker positions
+    desired ([float]): desired marker positions
+    increments ([float]): increments of the desired marker positions
+  """
+
+  def __init__(self, quantile):
+    p = quantile
+    self.quantile = quantile
+    self.count = 0
+    self.heights = []
+    self.positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+    self.desired = [1.0, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5.0]
+    self.increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+  def add(self, value):
+    """Add a value to the estimate."""
+
+    self.count += 1
+
+    # The first five values initialize the markers
+    if self.count <= 5:
+      self.heights.append(value)
+      self.heights.sort()
+      return
+
+    q = self.heights
+    n = self.positions
+
+    # Find the cell k such that q[k] <= value < q[k+1], adjusting the extremes
+    if value < q[0]:
+      q[0] = value
+      k = 0
+    elif value >= q[4]:
+      q[4] = value
+      k = 3
+    else:
+      k = 0
+      while value >= q[k + 1]:
+        k += 1
+
+    for i in xrange(k + 1, 5):
+      n[i] += 1
+    for i in xrange(0, 5):
+      self.desired[i] += self.increments[i]
+
+    # Adjust the heights of the middle markers if they are off position
+    for i in xrange(1, 4):
+      d = self.desired[i] - n[i]
+      if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+        d = 1 if d > 0 else -1
+
+        # Piecewise-parabolic prediction
+        height = q[i] + d / (n[i + 1] - n[i - 1]) * \
+          ((n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+           (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+        # Fall back on a linear prediction if the parabola isn't monotonic
+        if not q[i - 1] < height < q[i + 1]:
+          height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+
+        q[i] = height
+        n[i] += d
+
+  def value(self):
+    """Returns the estimated quantile, or None if no values were seen."""
+
+    if self.count == 0:
+      return None
+
+    if self.count <= 5:
+      return self.heights[int(round(self.quantile * (self.count - 1)))]
+
+    return self.heights[2]
+
+
+# Execution times of the runs, for functional (ConTest) and non-functional
+# runs (they differ as ConTest slows the testsuite down) and the number of
+# runs made at once.
+# (functional, concurrency) => QuantileEstimator
+_runTimes = {}
+
+# Execution times of the practice runs at startup, that every estimate of a
+# kind of run starts from (See seed_run_times)
+# functional => [float]
+_seedTimes = {}
+
+
+def get_estimate(functional, concurrency):
+  """Returns the estimate of the execution times of the runs of a kind,
+  creating it if needed."""
+
+  if (functional, concurrency) not in _runTimes:
+    estimate = QuantileEstimator(config._CONTEST_TIMEOUT_QUANTILE)
+    for seconds in _seedTimes.get(functional, []):
+      estimate.add(seconds)
+    _runTimes[(functional, concurrency)] = estimate
+
+  return _runTimes[(functional, concurrency)]
+
+
+def seed_run_times(functional, times):
+  """Start the estimates of a kind of run, for any number of concurrent runs,
+  from the execution times of the practice runs. Whatever was recorded for it
+  so far is dropped.
+
+  Args:
+    functional (bool): were they functional (ConTest) or non-functional runs
+    times ([float]): execution times of the successful practice runs
+  """
+
+  _seedTimes[functional] = list(times)
+
+  for key in [k for k in _runTimes if k[0] == functional]:
+    del _runTimes[key]
+
+
+def add_run_time(functional, seconds, concurrency=1):
+  """Record the execution time of a successful test run.
+
+  Args:
+    functional (bool): was it a functional (ConTest) or non-functional run
+    seconds (float): execution time of the run
+    concurrency (int): number of runs made at once
+  """
+
+  get_estimate(functional, concurrency).add(seconds)
+
+
+def get_timeout(functional, concurrency=1):
+  """Determine the timeout of the next test run.
+
+  Until config._CONTEST_TIMEOUT_MIN_SAMPLES runs have been recorded,
+  config._CONTEST_TIMEOUT_SEC is used. After that the timeout is the estimated
+  config._CONTEST_TIMEOUT_QUANTILE of the execution times multiplied by
+  config._CONTEST_TIMEOUT_SAFETY_FACTOR. It never exceeds
+  config._CONTEST_TIMEOUT_SEC or goes below config._CONTEST_TIMEOUT_MIN_SEC.
+
+  Args:
+    functional (bool): is it a functional (ConTest) or non-functional run
+    concurrency (int): number of runs made at once
+
+  Returns:
+    float: timeout in seconds
+  """
+
+  estimate = get_estimate(functional, concurrency)
+  if not config._CONTEST_ADAPTIVE_TIMEOUT \
+    or estimate.count < config._CONTEST_TIMEOUT_MIN_SAMPLES:
+    return config._CONTEST_TIMEOUT_SEC
+
+  timeout = estimate.value() * config._CONTEST_TIMEOUT_SAFETY_FACTOR
+  timeout = max(timeout, config._CONTEST_TIMEOUT_MIN_SEC)
+  return min(timeout, config._CONTEST_TIMEOUT_SEC)
+
+
+def get_expected_time(functional, concurrency=1):
+  """Estimate how long a test run should take at most when nothing is wrong.
+
+  This is the estimated config._CONTEST_TIMEOUT_QUANTILE of the execution
+  times. Until config._CONTEST_TIMEOUT_MIN_SAMPLES runs have been recorded,
+  the average execution time found at startup is used instead.
+
+  Args:
+    functional (bool): is it a functional (ConTest) or non-functional run
+    concurrency (int): number of runs made at once
+
+  Returns:
+    float: expected execution time in seconds
+  """
+
+  estimate = get_estimate(functional, concurrency)
+  if estimate.count < config._CONTEST_TIMEOUT_MIN_SAMPLES:
+    return config._CONTEST_TIMEOUT_SEC / config._CONTEST_TIMEOUT_MULTIPLIER
+
+  return estimate.value()
@@ -14,8 +14,12 @@ import subprocess
 import tempfile
 import re
 import os
+import math
 import shutil
+from shutil import ignore_patterns
+from collections import Counter
 from _evolution import static
+import runtimes
 
 sys.path.append("..")  # To allow importing parent directory module
 import config
@@ -24,6 +28,255 @@ import logging
 logger = logging.getLogger('output-log')
 
 
+# Number of times each test method, eg: 'testPut(net.sf.cache4j.CacheTest)',
+# failed over all the test runs so far
+_failedTests = Counter()
+
+# Directory holding the compiled ArcTestRunner, False if it couldn't be
+# compiled and None if it wasn't compiled yet
+_runnerDir = None
+
+
+# Tiny testsuites ArcTestRunner is tried on once it is compiled (See
+# check_screening_runner)
+_RUNNER_CHECK_SRC = {
+'ArcRunnerPassTest': """import org.junit.Test;
+
+public class ArcRunnerPassTest {
+  @Test public void testFirst() {}
+  @Test public void testSecond() {}
+}
+""",
+'ArcRunnerFailTest': """import org.junit.Test;
+import static org.junit.Assert.fail;
+
+public class ArcRunnerFailTest {
+  @Test public void testFails() { fail("expected"); }
+  @Test public void testPasses() {}
+}
+"""}
+
+# Seconds a run of the check has to finish in
+_RUNNER_CHECK_TIMEOUT = 60
+
+
+def compile_screening_runner():
+  """Compiles ArcTestRunner.java for the screening runs. It is part of
+  building the project when ARC starts (See arc.py). If it can't be
+  compiled, or doesn't pass check_screening_runner, the screening runs run
+  the whole testsuite with JUnitCore.
+
+  Returns:
+    bool: True if it was compiled and works
+  """
+
+  global _runnerDir
+
+  _runnerDir = False
+  if not config._CONTEST_SCREENING:
+    return False
+
+  runnerDir = os.path.join(config._CACHE_DIR, 'runner')
+  if os.path.exists(runnerDir):
+    shutil.rmtree(runnerDir)
+  os.makedirs(runnerDir)
+
+  if not compile_java(runnerDir, [config._CONTEST_RUNNER_SRC]) or \
+    not os.path.exists(os.path.join(runnerDir, 'ArcTestRunner.class')):
+    logger.warn("Couldn't compile {}, screening runs will run the whole "
+      "testsuite".format(config._CONTEST_RUNNER_SRC))
+    return False
+
+  if not check_screening_runner(runnerDir):
+    logger.warn("ArcTestRunner doesn't run as expected, screening runs will "
+      "run the whole testsuite")
+    return False
+
+  _runnerDir = runnerDir
+  return True
+
+
+def compile_java(classDir, sourceFiles):
+  """Compiles Java source files against JUnit.
+
+  Args:
+    classDir (string): directory the classes are put in
+    sourceFiles ([string]): the .java files
+
+  Returns:
+    bool: True if they were compiled
+  """
+
+  errFile = tempfile.SpooledTemporaryFile()
+  try:
+    returnCode = subprocess.call(['javac', '-cp', config._JUNIT_JAR, '-d',
+                   classDir] + sourceFiles,
+                   stdout=tempfile.TemporaryFile(), stderr=errFile, shell=False)
+  except OSError as e:
+    logger.warn("Couldn't run javac: {}".format(e))
+    return False
+
+  if returnCode != 0:
+    errFile.seek(0)
+    logger.warn("javac failed:\n{}".format(errFile.read()))
+    return False
+
+  return True
+
+
+def check_screening_runner(runnerDir):
+  """Runs the compiled ArcTestRunner on tiny testsuites, to make sure it
+  reports the way tester.py reads it: a failing run stops at its first
+  failure, and a passing run runs each test method once, however many times
+  it is listed to run first.
+
+  Args:
+    runnerDir (string): directory holding the compiled ArcTestRunner
+
+  Returns:
+    bool: True if ArcTestRunner works
+  """
+
+  checkDir = os.path.join(runnerDir, 'check')
+  os.makedirs(checkDir)
+  sourceFiles = []
+  for className, source in _RUNNER_CHECK_SRC.items():
+    sourceFiles.append(os.path.join(checkDir, className + '.java'))
+    with open(sourceFiles[-1], 'w') as f:
+      f.write(source)
+
+  if not compile_java(checkDir, sourceFiles):
+    return False
+
+  classpath = os.pathsep.join([runnerDir, checkDir, config._JUNIT_JAR])
+
+  # The failing test method is run first, and the run stops there
+  returnCode, output = run_runner_check(classpath, ['ArcRunnerFailTest',
+                                        'testFails(ArcRunnerFailTest)'])
+  if returnCode != 1 or \
+    re.search("^1\) testFails\(ArcRunnerFailTest\)", output, re.MULTILINE) is None or \
+    re.search("Tests run: 1,\s+Failures: 1", output) is None:
+    logger.debug("ArcTestRunner on a failing testsuite:\n{}".format(output))
+    return False
+
+  returnCode, output = run_runner_check(classpath, ['ArcRunnerPassTest',
+                                        'testSecond(ArcRunnerPassTest)',
+                                        'testSecond(ArcRunnerPassTest)'])
+  if returnCode != 0 or output.find("OK (2 tests)") < 0:
+    logger.debug("ArcTestRunner on a passing testsuite:\n{}".format(output))
+    return False
+
+  return True
+
+
+def run_runner_check(classpath, args):
+  """Runs ArcTestRunner, giving up after _RUNNER_CHECK_TIMEOUT seconds.
+
+  Args:
+    classpath (string): holding ArcTestRunner, the testsuite and JUnit
+    args ([string]): arguments of ArcTestRunner
+
+  Returns:
+    (int, string): exit code and stdout of the run, None for the exit code
+      if it couldn't be run or didn't finish in time
+  """
+
+  outFile = tempfile.SpooledTemporaryFile()
+  try:
+    process = subprocess.Popen(['java', '-cp', classpath, 'ArcTestRunner'] + args,
+                stdout=outFile, stderr=subprocess.STDOUT, shell=False)
+  except OSError as e:
+    return None, str(e)
+
+  startTime = time.time()
+  while process.poll() is None:
+    if time.time() - startTime > _RUNNER_CHECK_TIMEOUT:
+      process.kill()
+      process.wait()
+      break
+    time.sleep(0.1)
+
+  outFile.seek(0)
+  output = outFile.read()
+  outFile.close()
+  if process.returncode is None or process.returncode < 0:
+    return None, output
+  return process.returncode, output
+
+
+def get_screening_runner():
+  """Returns the directory holding the compiled ArcTestRunner, or None if it
+  wasn't compiled (See compile_screening_runner)."""
+
+  if not _runnerDir:
+    return None
+  return _runnerDir
+
+
+def confidence_interval(values):
+  """95% confidence interval of the mean of values, using Student's t.
+
+  The critical value of the t distribution is approximated by the
+  Cornish-Fisher expansion around the normal distribution's 1.96, which is
+  accurate to two decimals from 2 degrees of freedom on.
+
+  Args:
+    values ([float]): the measurements, at least two of them
+
+  Returns:
+    (float, float): low and high ends of the interval
+  """
+
+  n = len(values)
+  mean = sum(values, 0.0) / n
+  variance = sum([(value - mean) ** 2 for value in values]) / (n - 1)
+
+  z = 1.959964
+  v = n - 1
+  t = z + (z ** 3 + z) / (4 * v) \
+        + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * v ** 2) \
+        + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * v ** 3) \
+        + (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3
+           - 945 * z) / (92160 * v ** 4)
+
+  halfWidth = t * math.sqrt(variance / n)
+  return (mean - halfWidth, mean + halfWidth)
+
+
+class TestRun():
+  """A single execution of the testsuite that is in progress.
+
+  Attributes:
+    process (Popen): testsuite execution process
+    outFile (SpooledTemporaryFile): temporary file to hold stdout output
+    errFile (SpooledTemporaryFile): temporary file to hold stderr output
+    number (int): test execution number
+    runDir (string): working directory of the process (Holds ConTest's state)
+    timeout (float): seconds the process has to finish in
+    concurrency (int): number of test processes run at once with it
+    startTime (float): when the process was started
+    lastProbe (float): when the deadlock probe last sent a SIGQUIT
+    probeOffset (int): how much of stdout the deadlock probe has searched
+    measured (bool): collect the resource usage of the process
+    usage (resource.struct_rusage): resource usage, once the process is reaped
+  """
+
+  def __init__(self, process, outFile, errFile, number, runDir, timeout,
+               concurrency, measured):
+    self.process = process
+    self.outFile = outFile
+    self.errFile = errFile
+    self.number = number
+    self.runDir = runDir
+    self.timeout = timeout
+    self.concurrency = concurrency
+    self.startTime = time.time()
+    self.lastProbe = 0
+    self.probeOffset = 0
+    self.measured = measured
+    self.usage = None
+
+
 class Tester():
   """Class that drives the process of running the testsuite a number of times.
 
@@ -39,6 +292,8 @@ class Tester():
     dataraces (int): number of test executions that resulted in a datarace
     deadlocks (int): number of test executions that resulted in a deadlock
     errors (int): number of test executions that resulted in an error
+    timedOut (int): number of test executions that were stopped at their
+      timeout (They count as timeouts or deadlocks)
   """
 
   successes = 0
@@ -46,14 +301,43 @@ class Tester():
   dataraces = 0
   deadlocks = 0
   errors = 0
+  timedOut = 0
 
   realTime = []
   voluntarySwitches = []
+  involuntarySwitches = []
+  maxMemory = []  # Maximum resident set size in KB
+  runTimes = []  # Wall-clock seconds of each run
+  runTimeouts = []  # Seconds each run had to finish in
   goodRuns = []  # True || False
 
 
-  def begin_testing(self, functional, exitOnFail = False, runs=config._CONTEST_RUNS):
-    """Begins the testing phase by creating the test processes."""
+  def begin_testing(self, functional, exitOnFail = False, runs=config._CONTEST_RUNS,
+                    parallel=True, earlyStop=False, untilPrecise=False,
+                    screening=False):
+    """Begins the testing phase by creating the test processes.
+
+    If config._CONTEST_PARALLEL is enabled, up to config._MAX_CORES test
+    processes are run at once, each in its own ConTest run directory. The
+    non-functional phase always runs one process at a time, as sibling JVMs
+    would skew the time and context switch measurements.
+
+    Args:
+      functional (bool): functional (ConTest) or non-functional (timed) runs
+      exitOnFail (bool): stop testing as soon as one run is unsuccessful
+      runs (int): the number of times to run the testsuite
+      parallel (bool): allow the runs to be spread over config._MAX_CORES
+      earlyStop (bool): stop starting runs once is_known_buggy decides the
+        program is buggy (If config._CONTEST_EARLY_STOP is enabled.) The runs
+        in progress are finished, and the number of runs made is then
+        len(goodRuns) rather than runs.
+      untilPrecise (bool): stop once is_precise finds the non-functional
+        measurements precise enough (If config._NONFUNCTIONAL_ADAPTIVE_RUNS is
+        enabled.) runs is then the maximum number of runs.
+      screening (bool): run the test methods that failed most often first and
+        stop each run at the first failing test (If config._CONTEST_SCREENING
+        is enabled.) Only meant for functional runs that don't validate.
+    """
 
     # Delete old ConTest longs.  Thousands can accumulate if this isn't done regularly
     conTestLogDir = os.path.join(config._PROJECT_DIR, 'com_ibm_contest', 'instLogs')
@@ -61,45 +345,83 @@ class Tester():
       shutil.rmtree(conTestLogDir)
       os.makedirs(conTestLogDir)
 
-    logger.debug("Performing {} Test Runs...".format(runs))
-    for i in range(1, runs + 1):
+    # The test methods to run first are chosen once, so all runs match
+    testCommand = self.get_test_command(functional and screening)
 
-      # To ensure stdout doesn't overflow because .poll() can deadlock
-      outFile = tempfile.SpooledTemporaryFile()
-      errFile = tempfile.SpooledTemporaryFile()
-
-      # Start a test process
-      if functional:
-        process = subprocess.Popen(['java', '-Xmx{}m'.format(config._PROJECT_TEST_MB),
-          '-XX:-UseSplitVerifier',
-          '-cp', config._PROJECT_CLASSPATH + ":" + config._JUNIT_JAR ,
-          '-javaagent:' + config._CONTEST_JAR,
-          '-Dcontest.verbose=0',  'org.junit.runner.JUnitCore',
-          config._PROJECT_TESTSUITE], stdout=outFile,
-          stderr=errFile, cwd=config._PROJECT_DIR, shell=False)
-      else:
-        # MAC uses a different time argument then Linux
-        # http://developer.apple.com/library/mac/#documentation/Darwin/Reference/ManPages/man1/time.1.html
-        if config._OS is 'MAC':
-          timeArg = '-lp' # BSD-style
-        else:
-          timeArg = '-v'  # Linux-style
+    concurrency = self.get_concurrency(functional, runs, parallel)
+    if concurrency > 1:
+      runDirs = self.setup_run_dirs(concurrency)
+    else:
+      runDirs = [config._PROJECT_DIR]
+
+    logger.debug("Performing {} Test Runs ({} at a time, {:.1f}s timeout)..."
+      .format(runs, len(runDirs), runtimes.get_timeout(functional,
+              len(runDirs))))
+    freeDirs = runDirs[:]
+    activeRuns = []
+    nextRun = 1
+    bugFound = False
+    stopEarly = False
+
+    # The runs finish out of order when they run in parallel. The slow ones
+    # (timeouts, deadlocks) finish last, so the sequential test is only fed
+    # the results of the runs in the order they were started.
+    # run number => result, for the runs finished ahead of an earlier run
+    finishedAhead = {}
+    # Results of the runs 1, 2, ... up to the first run still in progress
+    inOrder = []
+
+    while len(activeRuns) > 0 or (nextRun <= runs and not bugFound
+                                  and not stopEarly):
+
+      # Start a test process in every free run directory
+      while nextRun <= runs and not bugFound and not stopEarly \
+        and len(freeDirs) > 0:
+        activeRuns.append(self.start_test(functional, nextRun, freeDirs.pop(0),
+                                          testCommand, len(runDirs)))
+        nextRun += 1
 
-        process = subprocess.Popen(['/usr/bin/time', timeArg, 'java',
-                    '-XX:-UseSplitVerifier',
-                    '-Xmx{}m'.format(config._PROJECT_TEST_MB), '-cp',
-                    config._PROJECT_CLASSPATH + ":" + config._JUNIT_JAR, 'org.junit.runner.JUnitCore',
-                    config._PROJECT_TESTSUITE],
-                    stdout=outFile, stderr=errFile, cwd=config._PROJECT_DIR,
-                    shell=False)
+      time.sleep(0.1)
 
-      success = self.run_test(process, outFile, errFile, i, functional)
+      for run in activeRuns[:]:
+        if not self.run_test(run, functional):
+          continue
+        activeRuns.remove(run)
+        freeDirs.append(run.runDir)
 
-      # If last run was unsuccessful and we are verifying functionality
-      if len(self.goodRuns) > 0:
+        # If last run was unsuccessful and we are verifying functionality
         if exitOnFail and not self.goodRuns[-1]:
-          logger.debug("Verification testing: A bug exists in the program")
-          return False
+          bugFound = True
+
+        finishedAhead[run.number] = self.goodRuns[-1]
+        while len(inOrder) + 1 in finishedAhead:
+          inOrder.append(finishedAhead.pop(len(inOrder) + 1))
+
+        # The remaining runs can't change the outcome of the evaluation. The
+        # runs in progress are left to finish, so the results aren't biased
+        # towards the runs that finish quickly.
+        if earlyStop and config._CONTEST_EARLY_STOP and not stopEarly \
+          and self.is_known_buggy(inOrder):
+          logger.debug("Sequential test: The program is buggy after {} runs"
+            .format(len(inOrder)))
+          stopEarly = True
+
+        # More runs won't change the non-functional measurements by much
+        if untilPrecise and config._NONFUNCTIONAL_ADAPTIVE_RUNS \
+          and not stopEarly and self.is_precise():
+          logger.debug("The measurements are precise enough after {} runs"
+            .format(len(self.goodRuns)))
+          stopEarly = True
+
+      # Once a bug is found, the runs still in progress are of no use
+      if bugFound:
+        for run in activeRuns:
+          self.cancel_test(run)
+        activeRuns = []
+
+    if bugFound:
+      logger.debug("Verification testing: A bug exists in the program")
+      return False
 
     logger.debug("Test Runs Results...")
     logger.debug("Successes: {}".format(self.successes))
@@ -107,18 +429,248 @@ class Tester():
     logger.debug("Dataraces: {}".format(self.dataraces))
     logger.debug("Deadlock: {}".format(self.deadlocks))
     logger.debug("Errors: {}".format(self.errors))
+    logger.debug("Runs: {} of {}".format(len(self.goodRuns), runs))
     logger.debug("Real Time: {}".format(self.realTime))
     logger.debug("Voluntary Switches: {}".format(self.voluntarySwitches))
+    logger.debug("Involuntary Switches: {}".format(self.involuntarySwitches))
+    logger.debug("Max Memory (KB): {}".format(self.maxMemory))
     logger.debug("Good Runs: {}".format(self.goodRuns))
 
-    if self.successes == runs:
+    if self.successes == len(self.goodRuns):
       return True
     else:
       return False
 
 
-  def run_test(self, process, outFile, errFile, i, functional):
-    """Runs a single test process.
+  def is_known_buggy(self, results):
+    """Sequential probability ratio test (SPRT) on the runs made so far.
+
+    The hypothesis that the program succeeds at the rate of a buggy program
+    (config._SPRT_BUGGY_RATE) is tested against it succeeding at the rate of a
+    fixed program (config._SPRT_FIXED_RATE). Only the decision for the buggy
+    program stops the testing, as a fix has to pass every run anyway.
+
+    Args:
+      results ([bool]): success of each run, in the order they were started
+
+    Returns:
+      bool: True if the program is buggy. A fixed program is (wrongly) found
+        buggy with a chance of at most config._SPRT_ALPHA
+    """
+
+    runs = len(results)
+    if runs < config._CONTEST_EARLY_STOP_MIN_RUNS:
+      return False
+
+    successes = results.count(True)
+    failures = runs - successes
+    buggyRate = config._SPRT_BUGGY_RATE
+    fixedRate = config._SPRT_FIXED_RATE
+
+    # Log likelihood ratio of fixed over buggy
+    ratio = successes * math.log(fixedRate / buggyRate) \
+            + failures * math.log((1 - fixedRate) / (1 - buggyRate))
+
+    return ratio <= math.log(config._SPRT_ALPHA / (1 - config._SPRT_BETA))
+
+
+  def is_precise(self):
+    """Checks if the non-functional measurements made so far are precise.
+
+    They are once there are at least config._NONFUNCTIONAL_MIN_RUNS of them,
+    and the 95% confidence intervals of the mean real time and the mean
+    voluntary context switches are each narrower than
+    config._NONFUNCTIONAL_CI_WIDTH (relative to the mean).
+
+    Returns:
+      bool: True if the measurements are precise enough
+    """
+
+    if len(self.realTime) < max(2, config._NONFUNCTIONAL_MIN_RUNS):
+      return False
+
+    for values in [self.realTime, self.voluntarySwitches]:
+      low, high = confidence_interval(values)
+      mean = (low + high) / 2
+      if high - low > abs(mean) * config._NONFUNCTIONAL_CI_WIDTH:
+        return False
+
+    return True
+
+
+  def get_concurrency(self, functional, runs, parallel=True):
+    """Returns how many test processes begin_testing runs at once.
+
+    Args:
+      functional, runs, parallel: As for begin_testing
+
+    Returns:
+      int: number of test processes run at once
+    """
+
+    if parallel and functional and config._CONTEST_PARALLEL \
+      and config._MAX_CORES > 1 and runs > 1:
+      return min(config._MAX_CORES, runs)
+    return 1
+
+
+  def setup_run_dirs(self, count):
+    """Creates an isolated ConTest run directory for each concurrent process.
+
+    ConTest keeps its state (instLogs, sharedVars.txt) in the com_ibm_contest
+    directory of the working directory of the JVM. Processes sharing the work
+    area would clobber each other's state, so each one is given a copy of the
+    work area's com_ibm_contest directory and the KingProperties file.
+
+    Args:
+      count (int): number of run directories to create
+
+    Returns:
+      [string]: the run directories, eg: tmp/contest/1/, tmp/contest/2/, ...
+    """
+
+    contestDir = os.path.join(config._PROJECT_DIR, 'com_ibm_contest')
+
+    runDirs = []
+    for slot in xrange(1, count + 1):
+      # tmp/contest/2/
+      runDir = os.path.join(config._CONTEST_RUN_DIR, str(slot)) + os.sep
+      if os.path.exists(runDir):
+        shutil.rmtree(runDir)
+
+      if os.path.exists(contestDir):
+        shutil.copytree(contestDir, os.path.join(runDir, 'com_ibm_contest'),
+          ignore=ignore_patterns('instLogs'))
+        os.makedirs(os.path.join(runDir, 'com_ibm_contest', 'instLogs'))
+      else:
+        os.makedirs(runDir)
+
+      shutil.copy(config._CONTEST_KINGPROPERTY, runDir)
+      runDirs.append(runDir)
+
+    return runDirs
+
+
+  def get_test_command(self, screening):
+    """Returns the main class and arguments that run the testsuite.
+
+    The whole testsuite is run by JUnitCore. A screening run is made by
+    ArcTestRunner instead, which runs the config._CONTEST_SCREENING_TESTS test
+    methods that failed most often first, and stops at the first failure.
+
+    Args:
+      screening (bool): is it a screening run
+
+    Returns:
+      [string]: main class and arguments, eg: ['org.junit.runner.JUnitCore',
+        'Cache4jTest']
+    """
+
+    if screening and config._CONTEST_SCREENING and \
+      get_screening_runner() is not None:
+      mostFailed = [name for name, count in
+                    _failedTests.most_common(config._CONTEST_SCREENING_TESTS)]
+      return ['ArcTestRunner', config._PROJECT_TESTSUITE] + mostFailed
+
+    return ['org.junit.runner.JUnitCore', config._PROJECT_TESTSUITE]
+
+
+  def get_classpath(self, runDir, testCommand):
+    """Returns the classpath of the testsuite for a process started in runDir.
+
+    The classpath acquired from 'ant test' can contain entries relative to the
+    work area. They are made absolute when the process runs somewhere else.
+    """
+
+    classpath = config._PROJECT_CLASSPATH + ":" + config._JUNIT_JAR
+    if testCommand[0] == 'ArcTestRunner':
+      classpath += ":" + get_screening_runner()
+    if runDir == config._PROJECT_DIR:
+      return classpath
+
+    entries = [os.path.join(config._PROJECT_DIR, entry)
+               for entry in classpath.split(":") if entry != ""]
+    return ":".join(entries)
+
+
+  def start_test(self, functional, i, runDir, testCommand, concurrency):
+    """Starts a single test process.
+
+    Args:
+      functional (bool): functional (ConTest) or non-functional (timed) run
+      i (int): current test execution number
+      runDir (string): working directory of the process
+      testCommand ([string]): main class and arguments (See get_test_command)
+      concurrency (int): number of test processes run at once
+
+    Returns:
+      TestRun: the started test execution
+    """
+
+    # To ensure stdout doesn't overflow because .poll() can deadlock
+    # The deadlock probe reads stdout while the process is running. It does so
+    # through a handle of its own, so that the process's write position in the
+    # file isn't disturbed. This needs a named file.
+    if config._CONTEST_DEADLOCK_PROBE:
+      outFile = tempfile.NamedTemporaryFile()
+    else:
+      outFile = tempfile.SpooledTemporaryFile()
+    errFile = tempfile.SpooledTemporaryFile()
+
+    # Start a test process
+    if functional:
+      process = subprocess.Popen(['java', '-Xmx{}m'.format(config._PROJECT_TEST_MB),
+        '-XX:-UseSplitVerifier',
+        '-cp', self.get_classpath(runDir, testCommand),
+        '-javaagent:' + config._CONTEST_JAR,
+        '-Dcontest.verbose=0'] + testCommand, stdout=outFile,
+        stderr=errFile, cwd=runDir, shell=False)
+    else:
+      # The time and context switches are taken from the resource usage of
+      # the process when it is reaped (See poll_test)
+      process = subprocess.Popen(['java',
+                  '-XX:-UseSplitVerifier',
+                  '-Xmx{}m'.format(config._PROJECT_TEST_MB), '-cp',
+                  self.get_classpath(runDir, testCommand)] + testCommand,
+                  stdout=outFile, stderr=errFile, cwd=runDir,
+                  shell=False)
+
+    return TestRun(process, outFile, errFile, i, runDir,
+                   runtimes.get_timeout(functional, concurrency), concurrency,
+                   not functional)
+
+
+  def poll_test(self, run):
+    """Checks if a test process has finished, like Popen.poll().
+
+    A measured process is reaped with os.wait4 instead, to collect its
+    resource usage (CPU time, context switches, memory) into run.usage.
+
+    Args:
+      run (TestRun): test execution to check on
+
+    Returns:
+      int: exit code of the process, or None if it is still running
+    """
+
+    process = run.process
+    if process.returncode is not None or not run.measured:
+      return process.poll()
+
+    pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+    if pid == 0:
+      return None
+
+    run.usage = usage
+    if os.WIFSIGNALED(status):
+      process.returncode = -os.WTERMSIG(status)
+    else:
+      process.returncode = os.WEXITSTATUS(status)
+    return process.returncode
+
+
+  def run_test(self, run, functional):
+    """Checks on a single test process, recording the result once it is done.
 
     The test process is run with a timeout mechanism in place to determine if
     the process is timing out or just deadlocked. The results of a test is
@@ -127,134 +679,238 @@ class Tester():
      * Timeout - the testsuite  didn't finished in time
      * Datarace - the testsuite had at least one failing test case
      * Deadlock - the testsuite timed out, and the JVM dump showed a deadlock
+       (or the deadlock probe found one while the testsuite was running)
      * Error - the testsuite didn't run correctly
 
     Args:
-      process (Popen): testsuite execution process
-      outFile (SpooledTemporaryFile): temporary file to hold stdout output
-      errFile (SpooledTemporaryFile): temporary file to hold stderr output
-      i (int): current test execution number
-    """
-
-    # Set a timeout for the running process
-    remainingTime = config._CONTEST_TIMEOUT_SEC
-    while process.poll() is None and remainingTime > 0:
-      time.sleep(0.1)
-      remainingTime -= 0.1
+      run (TestRun): test execution to check on
+      functional (bool): functional (ConTest) or non-functional (timed) run
 
-      # If the process did not finish in time
-      if process.poll() is None and remainingTime <= 0:
-
-        # Send the Quit signal to get thread dump information from JVM
-        process.send_signal(3)
+    Returns:
+      bool: True if the test process is done and its result was recorded
+    """
 
-        # Sleep for a second to let std finish, then send terminate command
-        time.sleep(1)
-        process.terminate()
+    process = run.process
+    outFile = run.outFile
+    errFile = run.errFile
+    i = run.number
+
+    # If the process did not finish in time
+    if self.poll_test(run) is None and time.time() - run.startTime >= run.timeout:
+
+      # Send the Quit signal to get thread dump information from JVM
+      process.send_signal(3)
+
+      # Sleep for a second to let std finish, then send terminate command
+      time.sleep(1)
+      process.terminate()
+
+      # Acquire the stdout information
+      outFile.seek(0)
+      errFile.seek(0)
+      output = outFile.read()
+      error = errFile.read()
+      outFile.close()
+      errFile.close()
+
+      # Check if there is any deadlock using "Java-level deadlock:"
+      if (output.find(b"Java-level deadlock:") >= 0):
+        logger.info("Test {} - Deadlock Encountered (Java-level deadlock)(Process didn't finish in time)".format(i))
+        self.deadlocks += 1
+      else:
+        if functional:
+          logger.info("Test {} - Timeout Encountered (Process didn't finish in time)".format(i))
+          self.timeouts += 1
+        else:
+          # If on non-functional, we cannot tell when deadlock thus assume it
+          logger.info("Test {} - Deadlock/Timeout Encountered (Process didn't finish in time)".format(i))
+          self.deadlocks += 1
+      self.timedOut += 1
+      self.goodRuns.append(False)
+
+    # If the process finished in time
+    elif self.poll_test(run) is not None:
+
+      # Acquire the stdout information
+      outFile.seek(0)
+      errFile.seek(0)
+      output = outFile.read()
+      error = errFile.read()
+      outFile.close()
+      errFile.close()
+
+
+      #logger.debug("==== Tester, Output text:\n")
+      #logger.debug(output)
+      #logger.debug("==== Tester, Error text:\n")
+      #logger.debug(error)
+
+      # Keep track of which test methods fail, eg:
+      # 1) testPut(net.sf.cache4j.CacheTest)
+      for testName in re.findall("^\d+\) (\S+\(\S+\))", output, re.MULTILINE):
+        _failedTests[testName] += 1
+
+      # Acquire the number of faults (accoring to ant test)
+      numTests = 0
+      numFailures = 0
+      numSuccesses = 0
+
+      stmtOne = re.search("Tests run: (\d+),\s+Failures: (\d+)", output)
+      if stmtOne is not None:
+        numTests = stmtOne.group(1)
+        numFailures = stmtOne.group(2)
+
+      stmtTwo = re.search("OK \((\d+) test", output)
+      if stmtTwo is not None:
+        numSuccesses = stmtTwo.group(1)
+
+      # Some tests have failed
+      if numTests > 0 and numFailures > 0:
+        totalFaults = numFailures
+        logger.info("Test {} - Datarace Encountered ({} errors)".format(i,
+                                                                totalFaults))
+        self.dataraces += 1
+        self.goodRuns.append(False)
 
-        # Acquire the stdout information
-        outFile.seek(0)
-        errFile.seek(0)
-        output = outFile.read()
-        error = errFile.read()
-        outFile.close()
-        errFile.close()
+      # Tests have no faults and no successes
+      elif numTests is 0 and numSuccesses is 0:
+        logger.info("Test {} - Deadlock Encountered".format(i))
+        self.deadlocks += 1
+        self.goodRuns.append(False)
 
-        # Check if there is any deadlock using "Java-level deadlock:"
-        if (output.find(b"Java-level deadlock:") >= 0):
-          logger.info("Test {} - Deadlock Encountered (Java-level deadlock)(Process didn't finish in time)".format(i))
-          self.deadlocks += 1
+      # Tests have successes
+      elif numSuccesses > 0 or (numTests > 0 and numFailures is 0):
+        if numTests > 0:
+          totalSuccesses = numTests
         else:
-          if functional:
-            logger.info("Test {} - Timeout Encountered (Process didn't finish in time)".format(i))
-            self.timeouts += 1
-          else:
-            # If on non-functional, we cannot tell when deadlock thus assume it
-            logger.info("Test {} - Deadlock/Timeout Encountered (Process didn't finish in time)".format(i))
-            self.deadlocks += 1
-        self.goodRuns.append(False)
+          totalSuccesses = numSuccesses
 
-      # If the process finished in time
-      elif process.poll() is not None:
-
-        # Acquire the stdout information
-        outFile.seek(0)
-        errFile.seek(0)
-        output = outFile.read()
-        error = errFile.read()
-        outFile.close()
-        errFile.close()
-
-
-        #logger.debug("==== Tester, Output text:\n")
-        #logger.debug(output)
-        #logger.debug("==== Tester, Error text:\n")
-        #logger.debug(error)
-
-        # Acquire the number of faults (accoring to ant test)
-        numTests = 0
-        numFailures = 0
-        numSuccesses = 0
-
-        stmtOne = re.search("Tests run: (\d+),\s+Failures: (\d+)", output)
-        if stmtOne is not None:
-          numTests = stmtOne.group(1)
-          numFailures = stmtOne.group(2)
-
-        stmtTwo = re.search("OK \((\d+) test", output)
-        if stmtTwo is not None:
-          numSuccesses = stmtTwo.group(1)
-
-        # Some tests have failed
-        if numTests > 0 and numFailures > 0:
-          totalFaults = numFailures
-          logger.info("Test {} - Datarace Encountered ({} errors)".format(i,
-                                                                  totalFaults))
-          self.dataraces += 1
+        # No tests were ran, thus some error occurred
+        if totalSuccesses is 0:
+          logger.info("Test {} - Error, no tests ran".format(i))
+          self.errors += 1
           self.goodRuns.append(False)
 
-        # Tests have no faults and no successes
-        elif numTests is 0 and numSuccesses is 0:
-          logger.info("Test {} - Deadlock Encountered".format(i))
-          self.deadlocks += 1
-          self.goodRuns.append(False)
+        # Successful tests were encounted
+        else:
+          logger.info("Test {} - Successful Execution".format(i))
+          self.successes += 1
+          self.goodRuns.append(True)
+          runtimes.add_run_time(functional, time.time() - run.startTime,
+                                run.concurrency)
+
+          if not functional:
+            usage = run.usage
+            self.realTime.append(usage.ru_utime + usage.ru_stime)
+            self.voluntarySwitches.append(float(usage.ru_nvcsw))
+            self.involuntarySwitches.append(float(usage.ru_nivcsw))
+
+            # ru_maxrss is in bytes on the Mac and in KB on Linux
+            if config._OS == 'MAC':
+              self.maxMemory.append(usage.ru_maxrss / 1024)
+            else:
+              self.maxMemory.append(float(usage.ru_maxrss))
+
+    # If the deadlock probe found a deadlock in the running process
+    elif config._CONTEST_DEADLOCK_PROBE and self.probe_deadlock(run, functional):
+      process.kill()
+      process.wait()
+      outFile.close()
+      errFile.close()
+
+      logger.info("Test {} - Deadlock Encountered (Java-level deadlock)(Found by probing the running process)".format(i))
+      self.deadlocks += 1
+      self.goodRuns.append(False)
+
+    # Still running
+    else:
+      return False
+
+    self.runTimes.append(time.time() - run.startTime)
+    self.runTimeouts.append(run.timeout)
 
-        # Tests have successes
-        elif numSuccesses > 0 or (numTests > 0 and numFailures is 0):
-          if numTests > 0:
-            totalSuccesses = numTests
-          else:
-            totalSuccesses = numSuccesses
-
-          # No tests were ran, thus some error occurred
-          if totalSuccesses is 0:
-            logger.info("Test {} - Error, no tests ran".format(i))
-            self.errors += 1
-            self.goodRuns.append(False)
-
-          # Successful tests were encounted
-          else:
-            logger.info("Test {} - Successful Execution".format(i))
-            self.successes += 1
-            self.goodRuns.append(True)
-
-            if not functional:
-              if config._OS is 'MAC':
-                userTime = re.search("user \s+ (\d+\.\d+)", error).groups()[0]
-                systemTime = re.search("sys \s+ (\d+\.\d+)", error).groups()[0]
-                voluntarySwitches = re.search("(\d+)\s+ voluntary context switches", error).groups()[0]
-              else: # Linux
-                userTime = re.search("User time \(seconds\): (\d+\.\d+)", error).groups()[0]
-                systemTime = re.search("System time \(seconds\): (\d+\.\d+)", error).groups()[0]
-                voluntarySwitches = re.search("Voluntary context switches: (\d+)", error).groups()[0]
-
-              self.realTime.append(float(userTime) + float(systemTime))
-              self.voluntarySwitches.append(float(voluntarySwitches))
+    # Runs in an isolated run directory report their shared variables there
+    if run.runDir != config._PROJECT_DIR:
+      self.collect_shared_vars(run.runDir)
 
     # If ConTest hasn't given us a list of (class.variable) involved in concurrency
     # yet, we keep looking for it.
     static.load_contest_list()
 
+    return True
+
+
+  def cancel_test(self, run):
+    """Kills a running test process without recording a result for it.
+
+    Args:
+      run (TestRun): test execution to cancel
+    """
+
+    if run.process.poll() is None:
+      run.process.kill()
+      run.process.wait()
+    run.outFile.close()
+    run.errFile.close()
+    logger.info("Test {} - Cancelled".format(run.number))
+
+
+  def probe_deadlock(self, run, functional):
+    """Looks for a deadlock in a test process that is still running.
+
+    Once the process has run for longer than expected (See
+    runtimes.get_expected_time), a SIGQUIT is sent to it every
+    config._CONTEST_DEADLOCK_PROBE_SEC seconds to have the JVM dump its
+    threads to stdout. The output written since the last probe is searched
+    for the JVM's deadlock report.
+
+    Args:
+      run (TestRun): running test execution to probe
+      functional (bool): functional (ConTest) or non-functional run
+
+    Returns:
+      bool: True if the JVM reported a Java-level deadlock
+    """
+
+    now = time.time()
+    if now - run.startTime < runtimes.get_expected_time(functional,
+                                                        run.concurrency):
+      return False
+    if now - run.lastProbe < config._CONTEST_DEADLOCK_PROBE_SEC:
+      return False
+    run.lastProbe = now
+
+    # Search the thread dumps of the previous probes first, as the JVM takes a
+    # moment to write them
+    deadlockReport = b"Java-level deadlock:"
+    with open(run.outFile.name, 'rb') as output:
+      output.seek(run.probeOffset)
+      text = output.read()
+    if text.find(deadlockReport) >= 0:
+      return True
+
+    # The report could be cut off at the end of what was written so far
+    run.probeOffset += max(0, len(text) - len(deadlockReport))
+
+    # Send the Quit signal to get thread dump information from JVM
+    run.process.send_signal(3)
+    return False
+
+
+  def collect_shared_vars(self, runDir):
+    """Copies ConTest's shared variable list from a run directory into the work
+    area, where static.load_contest_list looks for it, if the work area
+    doesn't have one yet."""
+
+    if static.did_contest_find_shared_variables():
+      return
+
+    sharedVarsFile = os.path.join(runDir, 'com_ibm_contest', 'sharedVars.txt')
+    if os.path.exists(sharedVarsFile) and os.path.getsize(sharedVarsFile) > 0:
+      if not os.path.exists(os.path.dirname(config._SHARED_VARS_FILE)):
+        os.makedirs(os.path.dirname(config._SHARED_VARS_FILE))
+      shutil.copy(sharedVarsFile, config._SHARED_VARS_FILE)
+
 
   def clear_results(self):
     """Clears the results of the test runs thus far."""
@@ -264,6 +920,11 @@ class Tester():
     self.dataraces = 0
     self.deadlocks = 0
     self.errors = 0
+    self.timedOut = 0
     del self.realTime [:]
     del self.voluntarySwitches [:]
+    del self.involuntarySwitches [:]
+    del self.maxMemory [:]
+    del self.runTimes [:]
+    del self.runTimeouts [:]
     del self.goodRuns [:]
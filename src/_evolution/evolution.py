@@ -15,8 +15,12 @@ from collections import Counter
 sys.path.append("..")  # To allow importing parent directory module
 import config
 from _contest import tester
+from _contest import runtimes
 from _txl import txl_operator
+from _txl import scratch
+from _txl import mutantcache
 import hashlist
+import testcache
 import static
 import os
 import logging
@@ -124,7 +128,8 @@ def start():
         txl_operator.compile_project()
         logger.debug("Acquiring Non-Functional worst score")
         contest = tester.Tester()
-        contest.begin_testing(False, False, config._CONTEST_RUNS * config._CONTEST_VALIDATION_MULTIPLIER)  # Measure performance
+        contest.begin_testing(False, False, config._CONTEST_RUNS * config._CONTEST_VALIDATION_MULTIPLIER,
+          untilPrecise=True)  # Measure performance
         worstScore = get_average_non_functional_score(contest, bestFunctional,
           config._CONTEST_RUNS * config._CONTEST_VALIDATION_MULTIPLIER)
 
@@ -235,6 +240,12 @@ def evolve(generation=0, worstScore=0):
   while True:
     generation += 1
 
+    # Keep this generation and the previous one in memory, if they fit
+    scratch.place_generation(generation)
+
+    # The versions of the files that no project has any more
+    txl_operator.prune_objects()
+
     # Mutate each individual
     moreMutations = False
     highestSoFar = -1
@@ -274,9 +285,14 @@ def evolve(generation=0, worstScore=0):
           .format(individual.generation - 2, individual.id))
         txl_operator.clean_up_mutants(individual.generation - 2, individual.id)
 
+      scratch.check_budget(generation)
+
     averageFitness.append(runningSum / config._EVOLUTION_POPULATION)
     bestFitness.append((highestSoFar, highestID))
 
+    # Make sure the mutants of the unchanged source files are reused
+    mutantcache.log_lookups(generation)
+
     # Check the terminating conditions
     if not _functionalPhase:
       if convergence(generation, bestFitness, averageFitness):
@@ -430,19 +446,10 @@ def mutation(individual, deadlockVotes, dataraceVotes, nonFunctionalVotes):
     # When we get here, we have selected a new mutant
     totTriedMutants += 1
 
-    # Now we check for reasons to exclude a mutant file:
-
-    # 1. If we are excluding run as a synchronizable method, check the selected
-    # mutant for it
-    if hasattr(config, '_EXCLUDE_RUN'):
-      if config._EXCLUDE_RUN:
-        if txl_operator.check_synch_run(individual.generation, individual.id,
-          selectedOperator[0], randomMutant + 1):
-          continue
-
-    # 2. Double locking on a variable isn't allowed:
-    # removed the if...: for testing
-    if txl_operator.check_double_synch(individual.generation, individual.id,
+    # Mutants that synchronize run() (with _EXCLUDE_RUN) or lock a variable
+    # twice were left out of the genome. Only the ones that weren't generated
+    # yet need checking here.
+    if txl_operator.is_disallowed_mutant(individual.generation, individual.id,
       selectedOperator[0], randomMutant + 1):
       continue
 
@@ -472,6 +479,9 @@ def mutation(individual, deadlockVotes, dataraceVotes, nonFunctionalVotes):
         format(individual.id, individual.generation, selectedOperator[0], randomMutant + 1))
       return True
 
+    # Put the work area back the way it was before the mutant
+    txl_operator.rollback_workarea()
+
 
   # If we weren't able to compile a mutant project, reset it to the pristine and leave
   # it for this generation. We'll try again next generation to do something with it.
@@ -708,24 +718,32 @@ def evaluate(individual, worstScore):
   # Bug fixing phase
   if _functionalPhase:
 
-    contest.begin_testing(_functionalPhase, False)
+    begin_cached_testing(contest, False, config._CONTEST_RUNS, earlyStop=True,
+                         screening=True)
+
+    # A sequential test could have stopped the evaluation early. Scale the
+    # results up to config._CONTEST_RUNS so they compare with full evaluations
+    runs = len(contest.goodRuns)
+    scale = config._CONTEST_RUNS / runs
 
     # Fitness
-    individual.score.append((contest.successes * config._SUCCESS_WEIGHT) + \
-                            (contest.timeouts * config._TIMEOUT_WEIGHT))
+    individual.score.append((contest.successes * scale * config._SUCCESS_WEIGHT) + \
+                            (contest.timeouts * scale * config._TIMEOUT_WEIGHT))
 
     # Store results into genome
-    individual.successes.append(contest.successes)
-    individual.timeouts.append(contest.timeouts)
-    individual.dataraces.append(contest.dataraces)
-    individual.deadlocks.append(contest.deadlocks)
-    individual.errors.append(contest.errors)
+    individual.runs.append(runs)
+    individual.successes.append(contest.successes * scale)
+    individual.timeouts.append(contest.timeouts * scale)
+    individual.dataraces.append(contest.dataraces * scale)
+    individual.deadlocks.append(contest.deadlocks * scale)
+    individual.errors.append(contest.errors * scale)
 
 
   # Optimization phase
   else:
     # Ensure functionality is still there
-    if contest.begin_testing(_functionalPhase, True, config._CONTEST_RUNS *
+    # A fixed number of runs, as the non-functional score depends on it
+    if begin_cached_testing(contest, True, config._CONTEST_RUNS *
       config._CONTEST_VALIDATION_MULTIPLIER):
       logger.debug("Optimization phase: Mutation didn't introduce any bugs")
 
@@ -756,6 +774,39 @@ def evaluate(individual, worstScore):
   contest.clear_results()
 
 
+def begin_cached_testing(contest, exitOnFail, runs, **testOptions):
+  """Test the compiled project in the work area, like contest.begin_testing.
+  If an identical compiled project was tested the same way before (even by an
+  earlier run of ARC), its outcome is loaded into contest instead of running
+  the tests again.  See testcache.py.
+
+  Attributes:
+    contest (Tester): Tester to hold the results
+    exitOnFail, runs, testOptions: As for Tester.begin_testing
+  Returns:
+    boolean: Did all the test runs succeed?
+  """
+
+  global _functionalPhase
+
+  key = None
+  if config._TEST_CACHE:
+    key = testcache.generate_key(_functionalPhase, exitOnFail, runs, testOptions)
+
+  # The timeout the runs would have
+  timeout = runtimes.get_timeout(_functionalPhase, contest.get_concurrency(
+    _functionalPhase, runs, testOptions.get('parallel', True)))
+
+  if key is not None and testcache.find_outcome(key, contest, timeout):
+    logger.info("Reusing the test outcome of an identical compiled project")
+  else:
+    contest.begin_testing(_functionalPhase, exitOnFail, runs, **testOptions)
+    if key is not None:
+      testcache.add_outcome(key, contest)
+
+  return contest.successes == len(contest.goodRuns)
+
+
 def check_repeat_mutant(individual):
   """Check to see if this particular mutant has been seen before. If it has,
   we don't need to evaluate it again.  Simply copy the results from the
@@ -800,6 +851,7 @@ def check_repeat_mutant(individual):
 
   # Copy the testing information into the individual
   individual.score.append(prevIndvidual.score[-1])
+  individual.runs.append(prevIndvidual.runs[-1])
   individual.successes.append(prevIndvidual.successes[-1])
   individual.timeouts.append(prevIndvidual.timeouts[-1])
   individual.dataraces.append(prevIndvidual.dataraces[-1])
@@ -833,14 +885,27 @@ def get_average_non_functional_score(contest, individual, numberOfRuns = config.
   individual.realTime.append(avgRealTime)
   individual.voluntarySwitches.append(avgVoluntarySwitches)
 
-  # Find the uncertainties in the measurements
-  maxRT = max(contest.realTime)
-  minRT = min(contest.realTime)
-  maxVS = max(contest.voluntarySwitches)
-  minVS = min(contest.voluntarySwitches)
-  # Uncertainties in both
-  uncRT = (maxRT - minRT) / avgRealTime
-  uncVS = (maxVS - minVS) / avgVoluntarySwitches
+  # and how precise the averages are
+  if len(contest.realTime) > 1:
+    individual.realTimeInterval.append(tester.confidence_interval(contest.realTime))
+    individual.voluntarySwitchesInterval.append(
+      tester.confidence_interval(contest.voluntarySwitches))
+  else:
+    individual.realTimeInterval.append((avgRealTime, avgRealTime))
+    individual.voluntarySwitchesInterval.append((avgVoluntarySwitches,
+                                                 avgVoluntarySwitches))
+
+  # Find the uncertainties in the measurements: the half-widths of the 95%
+  # confidence intervals relative to the averages. Unlike the spread of the
+  # runs, they shrink as more runs are made
+  lowRT, highRT = individual.realTimeInterval[-1]
+  lowVS, highVS = individual.voluntarySwitchesInterval[-1]
+  uncRT = 0.0
+  if avgRealTime:
+    uncRT = (highRT - lowRT) / 2 / avgRealTime
+  uncVS = 0.0
+  if avgVoluntarySwitches:
+    uncVS = (highVS - lowVS) / 2 / avgVoluntarySwitches
 
   # Determine which one is more significant
   sigNum = 0.0
@@ -1026,6 +1091,8 @@ def terminate(individual, generation, generationLimit):
 
     # ... and the individual passes the extended number of tests, we have
     # found a fix for the dataraces(s) and deadlock(s)
+    # The validation runs are spread over config._MAX_CORES. The first failing
+    # run cancels the ones still in progress.
     if tester.Tester().begin_testing(True, True, config._CONTEST_RUNS * config._CONTEST_VALIDATION_MULTIPLIER):
       tester.Tester().clear_results()
       logger.info("Found best individual {}".format(individual.id))
@@ -10,6 +10,7 @@ import sys
 sys.path.append("..")  # To allow importing parent directory module
 import zipfile
 import config
+from _txl import objectstore
 import logging
 import hashlib
 import shutil
@@ -29,6 +30,12 @@ def generate_hash(generation, memberNum):
   in the generation/member/ directory and determine its md5 hash
   """
 
+  # The snapshot of the project (See config._OBJECT_STORE)
+  tree = objectstore.load_snapshot(generation, memberNum)
+  if tree is not None:
+    return objectstore.hash_tree(tree, config._PROJECT_SRC_DIR.replace(
+           config._PROJECT_DIR, ''))
+
   # tmp/3/4/project.zip
   zipLoc = os.path.join(config._TMP_DIR, str(generation), str(memberNum), 'project.zip')
   # tmp/3/4/project/
@@ -97,3 +104,38 @@ def GetHashofDirs(directory, verbose=0):
     return -2
 
   return SHAhash.hexdigest()
+
+
+def hash_file(filePath):
+  """ Return the sha1 hash of the contents of a file """
+
+  SHAhash = hashlib.sha1()
+  with open(filePath, 'rb') as f1:
+    while True:
+      # Read file in as little chunks
+      buf = f1.read(65536)
+      if not buf : break
+      SHAhash.update(buf)
+
+  return SHAhash.hexdigest()
+
+
+def hash_directory(directory):
+  """ Return the sha1 hash of the files (relative paths and contents) in a
+  directory, or None if it doesn't exist. Unlike GetHashofDirs, the result
+  doesn't depend on the order os.walk lists the files in, so it can be kept
+  from one run of ARC to the next.
+  """
+
+  if not os.path.isdir(directory):
+    return None
+
+  SHAhash = hashlib.sha1()
+  for root, dirs, files in os.walk(directory):
+    dirs.sort()
+    for names in sorted(files):
+      filepath = os.path.join(root, names)
+      SHAhash.update(os.path.relpath(filepath, directory) + "\0")
+      SHAhash.update(hash_file(filepath))
+
+  return SHAhash.hexdigest()
@@ -33,6 +33,8 @@ class Individual():
   lastDataraceRate (double): the last individual had what rate of dataraces
   lastDeadlockRate (double): the last individual had what rate of deadlocks
   lastErrorRate (double): the last individual had what rate of errors
+  runs ([int]): number of test runs made for each evaluation (Results are
+    scaled up to config._CONTEST_RUNS when an evaluation was stopped early)
   """
 
   def __init__(self, height, id):
@@ -49,6 +51,7 @@ class Individual():
     self.lastOperator = ""
     self.appliedOperators = []
 
+    self.runs = []
     self.successes = []
     self.timeouts = []
     self.dataraces = []
@@ -56,6 +59,8 @@ class Individual():
     self.errors = []
     self.realTime = []
     self.voluntarySwitches = []
+    self.realTimeInterval = []  # 95% confidence interval (low, high)
+    self.voluntarySwitchesInterval = []  # 95% confidence interval (low, high)
     self.goodRuns = []  # Boolean
 
     self.score = []
@@ -127,9 +132,12 @@ class Individual():
     ret += " Switch Generation: {}\n".format(self.switchGeneration)
     ret += " Last Operator: {}\n".format(self.lastOperator)
     ret += " Applied Operators: {}\n".format(self.appliedOperators)
+    ret += " Runs: {}\n".format(self.runs)
     ret += " Successes: {}\n".format(self.successes)
     ret += " Real Time: {}\n".format(self.realTime)
+    ret += " Real Time Interval: {}\n".format(self.realTimeInterval)
     ret += " Voluntary Switches: {}\n".format(self.voluntarySwitches)
+    ret += " Voluntary Switches Interval: {}\n".format(self.voluntarySwitchesInterval)
     ret += " Score: {}\n".format(self.score)
     ret += " Restarted: {}\n".format(self.wasRestarted)
     ret += " Replaced: {}\n".format(self.wasReplaced)
@@ -146,6 +154,7 @@ class Individual():
     newIndividual.generation = self.generation
     newIndividual.lastOperator = self.lastOperator
     newIndividual.appliedOperators = self.appliedOperators[:]
+    newIndividual.runs = self.runs[:]
     newIndividual.successes = self.successes[:]
     newIndividual.timeouts = self.timeouts[:]
     newIndividual.dataraces = self.dataraces[:]
@@ -153,6 +162,8 @@ class Individual():
     newIndividual.errors = self.errors[:]
     newIndividual.realTime = self.realTime[:]
     newIndividual.voluntarySwitches = self.voluntarySwitches[:]
+    newIndividual.realTimeInterval = self.realTimeInterval[:]
+    newIndividual.voluntarySwitchesInterval = self.voluntarySwitchesInterval[:]
     newIndividual.goodRuns = self.goodRuns[:]
     newIndividual.score = self.score[:]
     newIndividual.wasRestarted = self.wasRestarted[:]
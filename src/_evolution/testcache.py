@@ -0,0 +1,185 @@
+"""Keep the outcomes of the ConTest runs of compiled projects on disk, so that
+an identical compiled project doesn't have to be tested a second time.
+
+Identical projects come up again and again: across generations, after a
+member is restarted to the pristine project and across runs of ARC on the
+same project. Unlike hashlist.py, which only remembers the source of projects
+seen during this run of ARC, the outcomes are kept in an SQLite database in
+config._CACHE_DIR. The least recently used outcomes are evicted once there
+are more than config._TEST_CACHE_MAX_ENTRIES of them.
+
+With config._CONTEST_ADAPTIVE_TIMEOUT, the timeout of the runs follows the
+run times seen so far (See _contest/runtimes.py), so an outcome is kept with
+the timeout each of its runs had. It is only reused if the runs would end
+the same way now: a run that finished must fit in the timeout the runs would
+have now, and a run that was stopped at its timeout must not have more time
+now than it had then.
+"""
+
+import os
+import sys
+import time
+import json
+import hashlib
+import sqlite3
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import hashlist
+import logging
+
+logger = logging.getLogger('output-log')
+
+# Results of a Tester that make up an outcome
+_COUNTS = ['successes', 'timeouts', 'dataraces', 'deadlocks', 'errors',
+           'timedOut']
+_LISTS = ['goodRuns', 'realTime', 'voluntarySwitches', 'involuntarySwitches',
+          'maxMemory', 'runTimes', 'runTimeouts']
+
+_connection = None
+
+
+def get_connection():
+  """ Open the outcome database, creating it if needed """
+
+  global _connection
+
+  if _connection is None:
+    if not os.path.exists(config._CACHE_DIR):
+      os.makedirs(config._CACHE_DIR)
+    _connection = sqlite3.connect(os.path.join(config._CACHE_DIR, 'tests.db'))
+    _connection.execute("CREATE TABLE IF NOT EXISTS outcomes (key TEXT PRIMARY KEY, "
+                        "outcome TEXT, lastUsed REAL)")
+    _connection.commit()
+
+  return _connection
+
+
+def generate_key(functional, exitOnFail, runs, testOptions):
+  """ Hash the source of the project in the work area and its whole test
+  set (config._PROJECT_SRC_DIR and config._PROJECT_TEST_DIR), together with
+  everything else that decides how it is tested.
+
+  The order screening runs try the test methods in changes as tests fail
+  (See Tester.get_test_command), but not the outcome, so it isn't part of
+  the key.
+
+  Attributes:
+  functional (bool): functional (ConTest) or non-functional runs
+  exitOnFail, runs, testOptions: arguments of Tester.begin_testing
+
+  Returns:
+  string: The key of the outcome, or None if there is no project
+  """
+
+  sourceHash = hashlist.hash_directory(config._PROJECT_SRC_DIR)
+  testHash = hashlist.hash_directory(config._PROJECT_TEST_DIR)
+  if sourceHash is None or testHash is None:
+    return None
+
+  SHAhash = hashlib.sha1()
+  SHAhash.update(sourceHash)
+  SHAhash.update(testHash)
+  SHAhash.update(repr((functional, exitOnFail, runs, sorted(testOptions.items()))))
+  SHAhash.update(repr((config._PROJECT_TESTSUITE, config._PROJECT_CLASSPATH,
+    config._JUNIT_JAR, config._CONTEST_JAR, config._PROJECT_TEST_MB,
+    config._CONTEST_EARLY_STOP, config._CONTEST_EARLY_STOP_MIN_RUNS,
+    config._SPRT_BUGGY_RATE, config._SPRT_FIXED_RATE, config._SPRT_ALPHA,
+    config._SPRT_BETA, config._NONFUNCTIONAL_ADAPTIVE_RUNS,
+    config._NONFUNCTIONAL_CI_WIDTH, config._NONFUNCTIONAL_MIN_RUNS,
+    config._CONTEST_TIMEOUT_SEC, config._CONTEST_ADAPTIVE_TIMEOUT,
+    config._CONTEST_TIMEOUT_QUANTILE, config._CONTEST_TIMEOUT_SAFETY_FACTOR,
+    config._CONTEST_TIMEOUT_MIN_SAMPLES, config._CONTEST_TIMEOUT_MIN_SEC,
+    config._CONTEST_DEADLOCK_PROBE, config._CONTEST_DEADLOCK_PROBE_SEC,
+    config._CONTEST_SCREENING, config._CONTEST_SCREENING_TESTS,
+    config._CONTEST_PARALLEL, config._MAX_CORES)))
+  if os.path.exists(config._CONTEST_KINGPROPERTY):
+    SHAhash.update(hashlist.hash_file(config._CONTEST_KINGPROPERTY))
+
+  return SHAhash.hexdigest()
+
+
+def find_outcome(key, contest, timeout):
+  """ Look for the outcome of key.  If it is found, it is loaded into the
+  Tester as if contest.begin_testing had just been called.
+
+  Attributes:
+  key (string): From generate_key
+  contest (Tester): Where to load the outcome into
+  timeout (float): Timeout the runs would have (See runtimes.get_timeout)
+
+  Returns:
+  boolean: Was the outcome found?
+  """
+
+  connection = get_connection()
+  row = connection.execute("SELECT outcome FROM outcomes WHERE key = ?",
+                           (key,)).fetchone()
+  if row is None:
+    return False
+
+  outcome = json.loads(row[0])
+
+  if config._CONTEST_ADAPTIVE_TIMEOUT and not is_valid(outcome, timeout):
+    return False
+
+  connection.execute("UPDATE outcomes SET lastUsed = ? WHERE key = ?",
+                     (time.time(), key))
+  connection.commit()
+
+  for name in _COUNTS:
+    setattr(contest, name, outcome[name])
+  # The Tester's lists are shared by all Testers, extend them in place
+  for name in _LISTS:
+    getattr(contest, name).extend(outcome.get(name, []))
+
+  return True
+
+
+def is_valid(outcome, timeout):
+  """ Would the runs of an outcome end the same way with timeout?
+
+  Attributes:
+  outcome (dict): As stored by add_outcome
+  timeout (float): Timeout the runs would have (See runtimes.get_timeout)
+
+  Returns:
+  boolean: True if the outcome can be reused
+  """
+
+  runTimes = outcome.get('runTimes', [])
+  runTimeouts = outcome.get('runTimeouts', [None] * len(runTimes))
+
+  for runTime, runTimeout in zip(runTimes, runTimeouts):
+    # It was stopped at its timeout, and could finish with more time
+    if runTimeout is not None and runTime >= runTimeout:
+      if timeout > runTimeout:
+        return False
+    # It finished, but would be stopped now
+    elif runTime > timeout:
+      return False
+
+  return True
+
+
+def add_outcome(key, contest):
+  """ Store the results of a Tester under key, evicting the least recently
+  used outcomes if there are too many.
+
+  Attributes:
+  key (string): From generate_key
+  contest (Tester): Holding the results of contest.begin_testing
+  """
+
+  outcome = {}
+  for name in _COUNTS:
+    outcome[name] = getattr(contest, name)
+  for name in _LISTS:
+    outcome[name] = getattr(contest, name)
+
+  connection = get_connection()
+  connection.execute("INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?)",
+                     (key, json.dumps(outcome), time.time()))
+  connection.execute("DELETE FROM outcomes WHERE key NOT IN (SELECT key FROM "
+                     "outcomes ORDER BY lastUsed DESC LIMIT ?)",
+                     (config._TEST_CACHE_MAX_ENTRIES,))
+  connection.commit()
@@ -0,0 +1,213 @@
+"""Delete directories without waiting for it.
+
+Deleting a directory of many small files (eg: the mutants of a member, or
+config._TMP_DIR of a previous run) can take a long time. delete renames the
+directory into config._GRAVEYARD_DIR instead, which takes no time if they are
+on the same file system, and a background thread removes the contents of the
+graveyard with a low priority 'rm' process. Anything left in the graveyard
+when ARC exits is removed by the next run.
+
+A rename can't leave its file system, so each file system ARC deletes from
+gets a graveyard of its own: config._GRAVEYARD_DIR for the disk, and one
+registered with add_graveyard for the scratch space in memory (See
+scratch.py). A directory on a file system without a graveyard is removed
+right away.
+
+If the free disk space drops below config._DELETE_MIN_FREE_MB, delete waits
+for the graveyard to be emptied, so deleted files can't fill up the disk.
+"""
+
+import os
+import sys
+import time
+import shutil
+import itertools
+import threading
+import subprocess
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import logging
+
+logger = logging.getLogger('output-log')
+
+_purger = None
+
+# The graveyards besides config._GRAVEYARD_DIR (See add_graveyard)
+_graveyards = []
+
+# Set when there is something in the graveyard to remove
+_wakeUp = threading.Event()
+# Set when the graveyard is empty
+_empty = threading.Event()
+
+# Numbers the graves, so each has a name of its own (See delete)
+_graveNumbers = itertools.count()
+
+
+def delete(path):
+  """ Delete a directory (or file) in the background.
+
+  Attributes:
+  path (string): What to delete
+  """
+
+  if not os.path.lexists(path):
+    return
+
+  if not os.path.exists(config._GRAVEYARD_DIR):
+    os.makedirs(config._GRAVEYARD_DIR)
+
+  graveyard = find_graveyard(path)
+
+  if graveyard is not None:
+    # graveyard/tmp.1234.7, renamed in one step, so the purger never sees a
+    # grave before what is deleted is in it
+    name = os.path.basename(os.path.normpath(path))
+    grave = os.path.join(graveyard, '{}.{}.{}'.format(name, os.getpid(),
+                         next(_graveNumbers)))
+    while os.path.lexists(grave):
+      grave = os.path.join(graveyard, '{}.{}.{}'.format(name, os.getpid(),
+                           next(_graveNumbers)))
+    try:
+      os.rename(path, grave)
+    except OSError:
+      graveyard = None
+
+  # On a file system without a graveyard
+  if graveyard is None:
+    logger.debug("Could not move {} to a graveyard, deleting it".format(path))
+    if os.path.isdir(path) and not os.path.islink(path):
+      shutil.rmtree(path)
+    else:
+      os.remove(path)
+    return
+
+  start_purger()
+
+  # Backpressure: Don't let the graveyard fill up the disk
+  if get_free_mb(graveyard) < config._DELETE_MIN_FREE_MB:
+    logger.debug("Low on disk space, waiting for the graveyard to be emptied")
+    wait_for_purge()
+
+
+def add_graveyard(graveyard):
+  """ Add a graveyard for the file system it is on, eg: the scratch space.
+  It must be emptied by the caller, anything in it is removed.
+
+  Attributes:
+  graveyard (string): The graveyard directory
+  """
+
+  if not os.path.exists(graveyard):
+    os.makedirs(graveyard)
+
+  if graveyard not in _graveyards:
+    _graveyards.append(graveyard)
+
+  if os.listdir(graveyard):
+    start_purger()
+
+
+def get_graveyards():
+  """ All of the graveyards, config._GRAVEYARD_DIR first """
+
+  return [g for g in [config._GRAVEYARD_DIR] + _graveyards if os.path.isdir(g)]
+
+
+def find_graveyard(path):
+  """ The graveyard on the same file system as path, or None if there isn't
+  one. The directory path is in decides, so a symbolic link is moved rather
+  than what it points to. """
+
+  device = os.stat(os.path.dirname(os.path.abspath(os.path.normpath(path)))).st_dev
+
+  for graveyard in get_graveyards():
+    if os.stat(graveyard).st_dev == device:
+      return graveyard
+
+  return None
+
+
+def start_purger():
+  """ Start the thread that empties the graveyard, if it isn't running """
+
+  global _purger
+
+  _empty.clear()
+  _wakeUp.set()
+
+  if _purger is None or not _purger.is_alive():
+    _purger = threading.Thread(target=purge_graveyard, name='graveyard-purger')
+    _purger.daemon = True
+    _purger.start()
+
+
+def purge_graveyard():
+  """ Remove the contents of the graveyards one grave at a time, forever """
+
+  # Graves that 'rm' couldn't remove, so they aren't tried again and again
+  failed = set()
+
+  while True:
+    _wakeUp.wait()
+    _wakeUp.clear()
+
+    while True:
+      graves = []
+      for graveyard in get_graveyards():
+        graves.extend(os.path.join(graveyard, g) for g in
+                      sorted(os.listdir(graveyard)))
+      graves = [g for g in graves if g not in failed]
+      if not graves:
+        break
+
+      for grave in graves:
+        process = subprocess.Popen(['nice', '-n', '19', 'rm', '-rf', grave],
+                  shell=False)
+        process.wait()
+
+        if process.returncode != 0:
+          logger.warning("Could not remove {} from the graveyard".format(grave))
+          failed.add(grave)
+
+    # Unless something was deleted in the meantime
+    if not _wakeUp.is_set():
+      _empty.set()
+
+
+def wait_for_purge(timeout=None):
+  """ Wait until the graveyard is empty.
+
+  Attributes:
+  timeout (float): Seconds to wait at most, or None to wait until it is
+
+  Returns:
+  boolean: Is the graveyard empty?
+  """
+
+  if _purger is None:
+    return True
+
+  # Wait a second at a time, as a wait without a timeout can't be interrupted
+  # (eg: by Ctrl-C)
+  end = None
+  if timeout is not None:
+    end = time.time() + timeout
+
+  while not _empty.is_set():
+    wait = 1.0
+    if end is not None:
+      wait = min(wait, end - time.time())
+      if wait <= 0:
+        return False
+    _empty.wait(wait)
+
+  return True
+
+
+def get_free_mb(graveyard=None):
+  """ The free space of the file system of a graveyard (by default
+  config._GRAVEYARD_DIR), in MB """
+
+  stat = os.statvfs(graveyard or config._GRAVEYARD_DIR)
+  return stat.f_bavail * stat.f_frsize / (1024 * 1024)
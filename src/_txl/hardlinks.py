@@ -0,0 +1,20 @@
+"""Hard link files instead of copying them where the file system allows it.
+
+The mutant cache (See mutantcache.py), the object store (See objectstore.py)
+and the local projects of the members share their files this way. A hard
+linked file must be replaced, never written to, as that would change it
+everywhere it is linked.
+"""
+
+import os
+import shutil
+
+
+def link_or_copy(srcFile, destFile):
+  """ Hard link srcFile to destFile, falling back on copying it when the two
+  are on different file systems (or hard links aren't supported) """
+
+  try:
+    os.link(srcFile, destFile)
+  except OSError:
+    shutil.copy2(srcFile, destFile)
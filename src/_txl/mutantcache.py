@@ -0,0 +1,242 @@
+"""Keep the mutants generated by TXL on disk, so that the mutants of a source
+file are only generated once (config._INCREMENTAL_MUTANTS).
+
+The mutants of a source file are the same whichever member or generation asks
+for them, and across runs of ARC on the same project. They are kept one
+directory per key (See txl_operator.get_mutant_key), with an SQLite index of
+their sizes and when they were last used, in config._CACHE_DIR/mutants/. The
+least recently used mutants are evicted once they take up more than
+config._MUTANT_CACHE_MAX_MB. Without config._MUTANT_CACHE, they are kept in
+config._TMP_DIR/mutants/ instead, which is emptied when ARC starts, so they
+are only reused within a run.
+
+With config._LAZY_MUTANTS, the mutants are only listed when a project is
+mutated. The listing is cached on its own, and each mutant is added to it
+when it is generated (See add_mutant_file), so a listed mutant may not be in
+the cache yet.
+
+The lookups are counted, so a cache that is never hit shows up in the log
+(See log_lookups).
+"""
+
+import os
+import sys
+import time
+import json
+import shutil
+import sqlite3
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import hardlinks
+import logging
+
+logger = logging.getLogger('output-log')
+
+_connection = None
+
+# Lookups of the current generation, and of the whole run
+_hits = 0
+_misses = 0
+_totalHits = 0
+_totalMisses = 0
+
+
+def get_cache_dir():
+  """ The directory holding the cached mutants """
+
+  if not config._MUTANT_CACHE:
+    return os.path.join(config._TMP_DIR, 'mutants')
+  return os.path.join(config._CACHE_DIR, 'mutants')
+
+
+def get_connection():
+  """ Open the mutant index, creating it if needed """
+
+  global _connection
+
+  if _connection is None:
+    if not os.path.exists(get_cache_dir()):
+      os.makedirs(get_cache_dir())
+    _connection = sqlite3.connect(os.path.join(get_cache_dir(), 'index.db'))
+    _connection.execute("CREATE TABLE IF NOT EXISTS mutants (key TEXT PRIMARY KEY, "
+                        "files TEXT, size INTEGER, lastUsed REAL, listed INTEGER "
+                        "DEFAULT 0)")
+    # Made before the listings were cached
+    columns = [row[1] for row in _connection.execute("PRAGMA table_info(mutants)")]
+    if 'listed' not in columns:
+      _connection.execute("ALTER TABLE mutants ADD COLUMN listed INTEGER DEFAULT 0")
+    _connection.commit()
+
+  return _connection
+
+
+def find_mutants(key, listing=False):
+  """ Look for the mutants of key.
+
+  Attributes:
+  key (string): From txl_operator.get_mutant_key
+  listing (boolean): Is a listing enough? The listed mutants that weren't
+    generated yet aren't in the cache (See add_mutant_file).
+
+  Returns:
+  [string]: The cached mutant files (possibly none), or None if they
+    aren't cached
+  """
+
+  global _hits, _misses
+
+  mutantFiles = lookup_mutants(key, listing)
+  if mutantFiles is None:
+    _misses += 1
+  else:
+    _hits += 1
+
+  return mutantFiles
+
+
+def lookup_mutants(key, listing):
+  """ See find_mutants """
+
+  connection = get_connection()
+  row = connection.execute("SELECT files, listed FROM mutants WHERE key = ?",
+                           (key,)).fetchone()
+  if row is None:
+    return None
+
+  keyDir = os.path.join(get_cache_dir(), key)
+  mutantFiles = [os.path.join(keyDir, f) for f in json.loads(row[0])]
+
+  # Something else removed them
+  if not os.path.isdir(keyDir) or (not row[1] and
+    not all(os.path.exists(f) for f in mutantFiles)):
+    remove_mutants(key)
+    return None
+
+  if not listing and not all(os.path.exists(f) for f in mutantFiles):
+    return None
+
+  connection.execute("UPDATE mutants SET lastUsed = ? WHERE key = ?",
+                     (time.time(), key))
+  connection.commit()
+
+  return mutantFiles
+
+
+def add_mutants(key, mutantFiles, listed=False):
+  """ Store the mutants of key, evicting the least recently used mutants if
+  the cache is over budget.
+
+  Attributes:
+  key (string): From txl_operator.get_mutant_key
+  mutantFiles ([string]): The mutants generated by TXL, or listed by it
+  listed (boolean): Were the mutants only listed? They are added as they are
+    generated (See add_mutant_file).
+  """
+
+  keyDir = os.path.join(get_cache_dir(), key)
+  if os.path.exists(keyDir):
+    shutil.rmtree(keyDir)
+  os.makedirs(keyDir)
+
+  size = 0
+  if not listed:
+    for mutantFile in mutantFiles:
+      hardlinks.link_or_copy(mutantFile, os.path.join(keyDir, os.path.basename(mutantFile)))
+      size += os.path.getsize(mutantFile)
+
+  connection = get_connection()
+  connection.execute("INSERT OR REPLACE INTO mutants VALUES (?, ?, ?, ?, ?)",
+                     (key, json.dumps([os.path.basename(f) for f in mutantFiles]),
+                     size, time.time(), int(listed)))
+  connection.commit()
+
+  evict_mutants()
+
+
+def add_mutant_file(key, mutantFile):
+  """ Store a mutant that was listed under key once it is generated. Nothing
+  is stored if the listing was evicted.
+
+  Attributes:
+  key (string): From txl_operator.get_mutant_key
+  mutantFile (string): The mutant generated by TXL
+  """
+
+  keyDir = os.path.join(get_cache_dir(), key)
+  cachedFile = os.path.join(keyDir, os.path.basename(mutantFile))
+
+  connection = get_connection()
+  row = connection.execute("SELECT files FROM mutants WHERE key = ? AND listed",
+                           (key,)).fetchone()
+  if row is None or not os.path.isdir(keyDir) or os.path.exists(cachedFile) or \
+    os.path.basename(mutantFile) not in json.loads(row[0]):
+    return
+
+  hardlinks.link_or_copy(mutantFile, cachedFile)
+  connection.execute("UPDATE mutants SET size = size + ?, lastUsed = ? WHERE "
+                     "key = ?", (os.path.getsize(mutantFile), time.time(), key))
+  connection.commit()
+
+  evict_mutants()
+
+
+def remove_mutants(key):
+  """ Remove the mutants of key from the cache """
+
+  keyDir = os.path.join(get_cache_dir(), key)
+  if os.path.exists(keyDir):
+    shutil.rmtree(keyDir)
+
+  connection = get_connection()
+  connection.execute("DELETE FROM mutants WHERE key = ?", (key,))
+  connection.commit()
+
+
+def evict_mutants():
+  """ Remove the least recently used mutants until the cache is within
+  config._MUTANT_CACHE_MAX_MB """
+
+  connection = get_connection()
+  total = connection.execute("SELECT SUM(size) FROM mutants").fetchone()[0] or 0
+  budget = config._MUTANT_CACHE_MAX_MB * 1024 * 1024
+
+  if total <= budget:
+    return
+
+  for key, size in connection.execute("SELECT key, size FROM mutants ORDER BY "
+                                      "lastUsed").fetchall():
+    remove_mutants(key)
+    total -= size
+    if total <= budget:
+      break
+
+  logger.debug("Evicted mutants from the cache, {} bytes remain".format(total))
+
+
+def log_lookups(generation):
+  """ Log the lookups of a generation, and warn if the cache was never hit
+  after the first generation. From the second generation on, most of the
+  source files of a member are the same as in the generation before, so their
+  mutants should be found in the cache.
+
+  Attributes:
+  generation (int): The generation that just ended
+  """
+
+  global _hits, _misses, _totalHits, _totalMisses
+
+  if not config._INCREMENTAL_MUTANTS:
+    return
+
+  logger.debug("Mutant cache: {} hits, {} misses in generation {}".format(
+               _hits, _misses, generation))
+
+  if generation > 1:
+    _totalHits += _hits
+    _totalMisses += _misses
+    if _totalHits == 0 and _totalMisses > 0:
+      logger.warning("The mutant cache wasn't hit since the first generation "
+                     "({} misses)".format(_totalMisses))
+
+  _hits = 0
+  _misses = 0
@@ -0,0 +1,208 @@
+"""Find the mutants that aren't allowed into the genome of a member.
+
+Some mutants are never worth trying: a mutant that locks the same variable
+twice in nested synchronized blocks, or, with config._EXCLUDE_RUN, one that
+synchronizes a run() method, turning the program into a sequential one. The
+mutants are classified once, after they are generated, by scanning their
+Java tokens (See txl_operator.classify_mutants).
+
+With config._LAZY_MUTANTS (off by default), most mutants are only listed
+when a project is mutated, so they can't be classified then. They are
+checked once they are selected instead (See
+txl_operator.is_disallowed_mutant), which costs the member that mutation.
+
+More rules can be added to _RULES.
+
+Different operators and targets often produce the same mutant, or mutants
+that only differ in whitespace and comments. With config._DEDUP_MUTANTS, the
+mutants are fingerprinted on their tokens so only one of them is tried.
+"""
+
+import re
+import hashlib
+import sys
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import logging
+
+logger = logging.getLogger('output-log')
+
+# Java source => tokens. Comments and whitespace are dropped and every string
+# or character literal is a single token, so its contents can't be mistaken
+# for code.
+_TOKEN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<literal>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+  | (?P<word>[A-Za-z_$][\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<symbol>.)
+  ''', re.S | re.X)
+
+
+def tokenize_java(source):
+  """ Split Java source into tokens.
+
+  Attributes:
+  source (string): Java source
+
+  Returns:
+  [string]: The tokens, eg: ['synchronized', '(', 'lock', ')', '{', ...]
+  """
+
+  return [match.group() for match in _TOKEN.finditer(source)
+          if match.lastgroup not in ('space', 'comment')]
+
+
+def find_closing(tokens, i):
+  """ Find the token closing the bracket at tokens[i] ('(' or '{').
+
+  Returns:
+  int: Index of the closing token, or len(tokens) if it isn't closed
+  """
+
+  opening = tokens[i]
+  closing = {'(': ')', '{': '}'}[opening]
+  depth = 0
+
+  for j in xrange(i, len(tokens)):
+    if tokens[j] == opening:
+      depth += 1
+    elif tokens[j] == closing:
+      depth -= 1
+      if depth == 0:
+        return j
+
+  return len(tokens)
+
+
+def synchronized_run(tokens):
+  """ Does a run() method of the source synchronize: is it declared
+  synchronized, or does its body hold a synchronized block?
+
+  Attributes:
+  tokens ([string]): From tokenize_java
+
+  Returns:
+  boolean: True if run() synchronizes
+  """
+
+  for i in xrange(1, len(tokens) - 1):
+    # void run(  (not thread.run( or return run( )
+    if tokens[i] != 'run' or tokens[i + 1] != '(':
+      continue
+    if not re.match(r'^[\w$]+$', tokens[i - 1]) or \
+      tokens[i - 1] in ('return', 'new', 'throw', 'else'):
+      continue
+
+    # A declaration has a body after its parameters (and throws clause)
+    j = find_closing(tokens, i + 1) + 1
+    if j < len(tokens) and tokens[j] == 'throws':
+      while j < len(tokens) and tokens[j] not in ('{', ';'):
+        j += 1
+    if j >= len(tokens) or tokens[j] != '{':
+      continue
+
+    # public synchronized void run() {
+    k = i - 1
+    while k >= 0 and tokens[k] not in (';', '{', '}'):
+      if tokens[k] == 'synchronized':
+        return True
+      k -= 1
+
+    # public void run() { ... synchronized (lock) { ... } ... }
+    if 'synchronized' in tokens[j:find_closing(tokens, j)]:
+      return True
+
+  return False
+
+
+def double_synchronized(tokens):
+  """ Does the source lock a variable again inside a synchronized block that
+  already holds it? eg:
+    synchronized (lock) { ... synchronized (lock) { ... } ... }
+
+  Attributes:
+  tokens ([string]): From tokenize_java
+
+  Returns:
+  boolean: True if a variable is locked twice
+  """
+
+  # (lock expression, brace depth of its block) of the enclosing blocks
+  held = []
+  depth = 0
+  lock = None
+
+  for i in xrange(len(tokens)):
+    if tokens[i] == 'synchronized' and i + 1 < len(tokens) and \
+      tokens[i + 1] == '(':
+      j = find_closing(tokens, i + 1)
+      # synchronized (lock) {
+      if j + 1 < len(tokens) and tokens[j + 1] == '{':
+        lock = ''.join(tokens[i + 2:j])
+        if lock in [l for l, d in held]:
+          return True
+
+    elif tokens[i] == '{':
+      depth += 1
+      if lock is not None:
+        held.append((lock, depth))
+        lock = None
+
+    elif tokens[i] == '}':
+      if held and held[-1][1] == depth:
+        held.pop()
+      depth -= 1
+
+  return False
+
+
+# (description, rule, config variable turning the rule on or None if it is
+# always on). A rule takes the tokens of a mutant and returns True if the
+# mutant isn't allowed.
+_RULES = [
+  ('double synchronization', double_synchronized, None),
+  ('synchronized run()', synchronized_run, '_EXCLUDE_RUN'),
+]
+
+
+def find_broken_rule(tokens):
+  """ Check a mutant against the rules that are turned on.
+
+  Attributes:
+  tokens ([string]): From tokenize_java, for the source of the mutant
+
+  Returns:
+  string: The description of the first rule it breaks, or None if the
+    mutant is allowed
+  """
+
+  for description, rule, switch in _RULES:
+    if switch is not None and not getattr(config, switch, False):
+      continue
+    if rule(tokens):
+      return description
+
+  return None
+
+
+def fingerprint(sourceFile, tokens):
+  """ Fingerprint a mutant, so that the mutants of a source file that only
+  differ in whitespace and comments have the same fingerprint.
+
+  Attributes:
+  sourceFile (string): The file that was mutated
+  tokens ([string]): From tokenize_java, for the source of the mutant
+
+  Returns:
+  string: The fingerprint
+  """
+
+  SHAhash = hashlib.sha1()
+  SHAhash.update(sourceFile)
+  for token in tokens:
+    SHAhash.update('\0')
+    SHAhash.update(token)
+
+  return SHAhash.hexdigest()
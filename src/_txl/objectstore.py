@@ -0,0 +1,216 @@
+"""Keep the local projects of the members as snapshots in a content-addressed
+object store, the way git does.
+
+Every version of a file is stored once in config._TMP_DIR/objects/, named by
+the sha1 hash of its contents, however many members and generations have it.
+A snapshot (tmp/gen/member/project.tree) maps the relative path of each file
+of a project to its object. The project directory (tmp/gen/member/project) is
+only checked out when it is needed, out of hard links to the objects (See
+txl_operator.checkout_local_project), so it must never be written to.
+
+The objects that no snapshot refers to any more (eg: the mutated files of a
+member whose mutant didn't compile) are removed by prune.
+"""
+
+import os
+import sys
+import glob
+import json
+import hashlib
+import shutil
+import tempfile
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import hardlinks
+import deleter
+import logging
+
+logger = logging.getLogger('output-log')
+
+
+def get_store_dir():
+  """ The directory holding the objects """
+
+  return os.path.join(config._TMP_DIR, 'objects')
+
+
+def get_object_file(name):
+  """ The file of an object, eg: tmp/objects/3f/2a9c... """
+
+  return os.path.join(get_store_dir(), name[:2], name[2:])
+
+
+def add_data(data, executable=False):
+  """ Store a version of a file, unless it is already stored.
+
+  Attributes:
+  data (string): Contents of the file
+  executable (boolean): Should the file be executable?
+
+  Returns:
+  string: The name of the object, the sha1 hash of data (with an 'x' after it
+    for executable files)
+  """
+
+  name = hashlib.sha1(data).hexdigest() + ('x' if executable else '')
+  objectFile = get_object_file(name)
+
+  if not os.path.exists(objectFile):
+    if not os.path.exists(os.path.dirname(objectFile)):
+      os.makedirs(os.path.dirname(objectFile))
+
+    # Write it beside the object and swap it in, so an object is never
+    # seen half written
+    fd, tmpFile = tempfile.mkstemp(dir=os.path.dirname(objectFile))
+    with os.fdopen(fd, 'wb') as f:
+      f.write(data)
+    os.chmod(tmpFile, 0755 if executable else 0644)
+    os.rename(tmpFile, objectFile)
+
+  return name
+
+
+def add_file(aFile):
+  """ Store the contents of a file, see add_data """
+
+  with open(aFile, 'rb') as f:
+    return add_data(f.read(), os.access(aFile, os.X_OK))
+
+
+def add_directory(srcDir, ignore=None):
+  """ Store the files of a directory.
+
+  Attributes:
+  srcDir (string): The directory, eg: input/
+  ignore (function): As for shutil.copytree
+
+  Returns:
+  {string: string}: The tree of the directory, relative path => object name
+  """
+
+  tree = {}
+
+  for root, dirs, files in os.walk(srcDir):
+    if ignore is not None:
+      ignored = ignore(root, dirs + files)
+      dirs[:] = [d for d in dirs if d not in ignored]
+      files = [f for f in files if f not in ignored]
+
+    for aFile in files:
+      srcFile = os.path.join(root, aFile)
+      tree[os.path.relpath(srcFile, srcDir)] = add_file(srcFile)
+
+  return tree
+
+
+def checkout(tree, destDir, link=True):
+  """ Write the files of a tree to a directory, replacing it.
+
+  Attributes:
+  tree ({string: string}): From add_directory or load_snapshot
+  destDir (string): Where to put the files
+  link (boolean): Hard link the files to the objects rather than copy them
+  """
+
+  if os.path.exists(destDir):
+    deleter.delete(destDir)
+  os.makedirs(destDir)
+
+  for relFile, name in tree.iteritems():
+    destFile = os.path.join(destDir, relFile)
+    if not os.path.exists(os.path.dirname(destFile)):
+      os.makedirs(os.path.dirname(destFile))
+
+    if link:
+      hardlinks.link_or_copy(get_object_file(name), destFile)
+    else:
+      shutil.copy2(get_object_file(name), destFile)
+
+
+def hash_tree(tree, prefix=''):
+  """ Return the sha1 hash of the files of a tree (relative paths and
+  contents) whose path starts with prefix, eg: source/ """
+
+  SHAhash = hashlib.sha1()
+  for relFile in sorted(tree):
+    if relFile.startswith(prefix):
+      SHAhash.update(relFile)
+      SHAhash.update(tree[relFile])
+
+  return SHAhash.hexdigest()
+
+
+def get_snapshot_file(generation, memberNum):
+  """ The snapshot of a member's project, eg: tmp/3/4/project.tree """
+
+  return os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+                      'project.tree')
+
+
+def load_snapshot(generation, memberNum):
+  """ Load the tree of a member's project, or None if there is no snapshot """
+
+  snapshotFile = get_snapshot_file(generation, memberNum)
+  if not os.path.exists(snapshotFile):
+    return None
+
+  with open(snapshotFile) as f:
+    return json.load(f)
+
+
+def save_snapshot(generation, memberNum, tree):
+  """ Replace the snapshot of a member's project. Its project directory no
+  longer matches it, so it is removed.
+
+  Attributes:
+  generation (int): Generation of the member
+  memberNum (int): Which member of the population
+  tree ({string: string}): The files of the project
+  """
+
+  snapshotFile = get_snapshot_file(generation, memberNum)
+  if not os.path.exists(os.path.dirname(snapshotFile)):
+    os.makedirs(os.path.dirname(snapshotFile))
+
+  fd, tmpFile = tempfile.mkstemp(dir=os.path.dirname(snapshotFile))
+  with os.fdopen(fd, 'w') as f:
+    json.dump(tree, f)
+  os.rename(tmpFile, snapshotFile)
+
+  projectDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+                            'project')
+  if os.path.exists(projectDir):
+    deleter.delete(projectDir)
+
+
+def prune(trees):
+  """ Remove the objects that no snapshot refers to. Objects are only added
+  with a snapshot (or a tree, such as the pristine project's) that refers to
+  them, so this must not be called between the two.
+
+  Attributes:
+  trees ([{string: string}]): The trees to keep besides the snapshots
+  """
+
+  reachable = set()
+  for tree in trees:
+    reachable.update(tree.itervalues())
+
+  # tmp/3/4/project.tree
+  for snapshotFile in glob.glob(get_snapshot_file('*', '*')):
+    with open(snapshotFile) as f:
+      reachable.update(json.load(f).itervalues())
+
+  storeDir = get_store_dir()
+  if not os.path.isdir(storeDir):
+    return
+
+  pruned = 0
+  # tmp/objects/3f/2a9c...
+  for prefix in os.listdir(storeDir):
+    for rest in os.listdir(os.path.join(storeDir, prefix)):
+      if prefix + rest not in reachable:
+        os.remove(os.path.join(storeDir, prefix, rest))
+        pruned += 1
+
+  logger.debug("Pruned {} objects, {} remain".format(pruned, len(reachable)))
@@ -0,0 +1,215 @@
+"""Keep the directories with the most small file traffic in memory.
+
+With config._SCRATCH_DIR on a RAM backed file system (eg: /dev/shm/arc/), the
+generation directories (tmp/gen/) of the current and previous generations,
+the isolated ConTest runs (config._CONTEST_RUN_DIR) and the compiled classes
+of the work area (config._PROJECT_CLASS_DIR) are kept there. They are
+replaced by symbolic links, so their paths don't change. None of them needs
+to survive ARC. The scratch space has a graveyard of its own (See
+deleter.py), so what is deleted in it is moved within memory. The object
+store (See objectstore.py) grows with every project checked in, and stays on
+disk.
+
+The scratch space is limited to config._MAX_MEMORY_MB. Older generations are
+spilled to config._TMP_DIR on disk as the evolution moves on, and earlier if
+the scratch space goes over budget, but never the current generation. A
+generation that starts over budget is put on disk (See place_generation).
+"""
+
+import os
+import sys
+import shutil
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import deleter
+import logging
+
+logger = logging.getLogger('output-log')
+
+# Is the scratch space in use?
+_active = False
+
+
+def setup():
+  """ Empty the scratch space and put the ConTest runs in it. Without a RAM
+  backed file system, nothing is kept in memory. """
+
+  global _active
+
+  _active = False
+  if not config._SCRATCH_DIR or config._MAX_MEMORY_MB <= 0:
+    return
+
+  scratchDir = os.path.normpath(config._SCRATCH_DIR)
+  if not os.path.isdir(os.path.dirname(scratchDir)):
+    logger.info("No scratch space at {}, using {}".format(config._SCRATCH_DIR,
+                config._TMP_DIR))
+    return
+
+  # Left over from a previous run
+  if os.path.exists(scratchDir):
+    shutil.rmtree(scratchDir)
+  os.makedirs(scratchDir)
+
+  _active = True
+
+  deleter.add_graveyard(get_graveyard())
+
+  place_dir(config._CONTEST_RUN_DIR, 'contest')
+
+
+def place_dir(path, name):
+  """ Replace a directory with an empty one in the scratch space, or empty it
+  if it is already there. Without scratch space, it is emptied in place.
+
+  Attributes:
+  path (string): The directory, eg: config._PROJECT_CLASS_DIR
+  name (string): Its name in the scratch space, eg: class
+  """
+
+  path = os.path.normpath(path)
+
+  if not _active:
+    if os.path.islink(path):
+      os.remove(path)
+    elif os.path.exists(path):
+      shutil.rmtree(path)
+    os.makedirs(path)
+    return
+
+  ramDir = os.path.join(config._SCRATCH_DIR, name)
+  if os.path.exists(ramDir):
+    shutil.rmtree(ramDir)
+  os.makedirs(ramDir)
+
+  if os.path.islink(path) and os.readlink(path) == ramDir:
+    return
+
+  if os.path.islink(path):
+    os.remove(path)
+  elif os.path.exists(path):
+    shutil.rmtree(path)
+  if not os.path.exists(os.path.dirname(path)):
+    os.makedirs(os.path.dirname(path))
+  os.symlink(ramDir, path)
+
+
+def place_generation(generation):
+  """ At the start of a generation, spill the generations before the previous
+  one to disk, and put the directory of the generation (tmp/gen/) in the
+  scratch space. If the scratch space is over budget, the previous generation
+  is spilled too, and if that isn't enough, the generation is put on disk.
+
+  Attributes:
+  generation (int): The generation that is starting
+  """
+
+  if not _active:
+    return
+
+  for ramGeneration in get_ram_generations():
+    if ramGeneration < generation - 1:
+      spill_generation(ramGeneration)
+
+  check_budget(generation)
+
+  # tmp/3
+  linkDir = os.path.join(config._TMP_DIR, str(generation))
+  if os.path.lexists(linkDir):
+    return
+
+  if get_used_mb() > config._MAX_MEMORY_MB:
+    logger.debug("Scratch space over budget, generation {} is on disk".format(
+                 generation))
+    os.makedirs(linkDir)
+    return
+
+  ramDir = os.path.join(config._SCRATCH_DIR, str(generation))
+  if not os.path.exists(ramDir):
+    os.makedirs(ramDir)
+  os.symlink(ramDir, linkDir)
+
+
+def check_budget(generation):
+  """ Spill the oldest generations to disk while the scratch space is over
+  config._MAX_MEMORY_MB. The current generation is left where it is.
+
+  Attributes:
+  generation (int): The current generation
+  """
+
+  if not _active:
+    return
+
+  ramGenerations = [g for g in get_ram_generations() if g < generation]
+  while ramGenerations and get_used_mb() > config._MAX_MEMORY_MB:
+    spill_generation(ramGenerations.pop(0))
+
+
+def get_ram_generations():
+  """ The generations in the scratch space, oldest first """
+
+  return sorted(int(name) for name in os.listdir(config._SCRATCH_DIR)
+                if name.isdigit())
+
+
+def spill_generation(generation):
+  """ Move a generation from the scratch space to config._TMP_DIR. The symbolic
+  link is replaced by the directory, so its paths don't change. """
+
+  linkDir = os.path.join(config._TMP_DIR, str(generation))
+  ramDir = os.path.join(config._SCRATCH_DIR, str(generation))
+  spillDir = linkDir + '.spill'
+
+  logger.debug("Spilling generation {} to disk".format(generation))
+
+  if os.path.exists(spillDir):
+    shutil.rmtree(spillDir)
+  shutil.copytree(ramDir, spillDir, symlinks=True)
+
+  if os.path.islink(linkDir):
+    os.remove(linkDir)
+  os.rename(spillDir, linkDir)
+
+  # Not through the graveyard, so the memory is free for get_used_mb
+  shutil.rmtree(ramDir)
+
+
+def get_graveyard():
+  """ The graveyard of the scratch space (See deleter.py) """
+
+  return os.path.join(os.path.normpath(config._SCRATCH_DIR), 'graveyard')
+
+
+def get_used_bytes():
+  """ The bytes ARC's files take up in the scratch space, like du. The
+  graveyard and anything else on the file system don't count. Hard linked
+  files count once. """
+
+  scratchDir = os.path.normpath(config._SCRATCH_DIR)
+  graveyard = get_graveyard()
+  inodes = set()
+  used = 0
+
+  for root, dirs, files in os.walk(scratchDir):
+    if root == scratchDir:
+      dirs[:] = [d for d in dirs if os.path.join(root, d) != graveyard]
+
+    for name in files:
+      stat = os.lstat(os.path.join(root, name))
+      if stat.st_nlink > 1:
+        if stat.st_ino in inodes:
+          continue
+        inodes.add(stat.st_ino)
+      used += stat.st_blocks * 512
+
+  return used
+
+
+def get_used_mb():
+  """ The space ARC's files take up in the scratch space, in MB. It walks the
+  scratch space, which only holds the last two generations, the ConTest runs
+  and the compiled classes, and is done a few times per generation (See
+  place_generation and check_budget). """
+
+  return get_used_bytes() / (1024.0 * 1024)
@@ -17,7 +17,16 @@ import tempfile
 import time
 import shutil
 import re
+import hashlib
+import zlib
 from _evolution import static
+from _evolution import hashlist
+import mutantcache
+import hardlinks
+import mutantfilter
+import objectstore
+import deleter
+import scratch
 from shutil import ignore_patterns
 
 sys.path.append("..")  # To allow importing parent directory module
@@ -25,9 +34,6 @@ import config
 
 import logging
 logger = logging.getLogger('output-log')
-# Send2Trash from https://pypi.python.org/pypi/Send2Trash
-# See arc.py for more details
-from send2trash import send2trash
 
 # A dictionary to hold the path of unique mutations by individual's and
 # generation. The mapping is:
@@ -37,6 +43,81 @@ from send2trash import send2trash
 #                 /EXCR/EXCR_DeadlockDemo_1.java_3
 uniqueMutants = {}
 
+# The number of mutants of each member that were left out of uniqueMutants as
+# duplicates of another mutant (See config._DEDUP_MUTANTS)
+# (generation, memberNum) => int
+duplicateMutants = {}
+
+# TXL program => compiled TXL program, for the programs compiled in this run
+_compiledPrograms = {}
+
+# TXL program => hash of the program and the files it includes
+_programHashes = {}
+
+# The mutants of each member, recorded as they are generated (See
+# recursively_mutate_project)
+# (generation, memberNum) => [Mutant]
+_manifests = {}
+
+# With config._LAZY_MUTANTS, the mutants are only listed when a project is
+# mutated. They are generated when they are needed (See materialise_mutant).
+# mutant file => (source file, TXL program, mutant file prefix, target args,
+#                 mutant key or None)
+_mutantSites = {}
+
+# With config._PACK_MUTANTS, the mutants of a member are kept as compressed
+# records in one pack file (See pack_mutants).
+# mutant file => (pack file, offset, length)
+_packedMutants = {}
+
+# With config._OBJECT_STORE, the tree of the pristine project
+_pristineTree = None
+
+# With config._SYNC_WORKAREA, the files of the work area that were copied from
+# a local project (See sync_workarea)
+# relative path => (size, mtime, sha1 hash or None if it wasn't needed yet), or
+# with config._OBJECT_STORE, (None, None, object name)
+_workareaFiles = None
+# The changes of the last sync, so they can be undone (See rollback_workarea)
+# [(relative path, backup of the old file or None, old _workareaFiles entry)]
+_workareaJournal = []
+
+# The mutants in uniqueMutants that weren't checked against the exclusion
+# rules when the representation was built, as they weren't generated yet
+# (See is_disallowed_mutant)
+_uncheckedMutants = set()
+
+
+class Mutant():
+  """A mutant in the manifest of a member.
+
+  Attributes:
+    operator (string): Name of the mutation operator, eg: ASAT
+    number (int): Number of the mutant among the member's mutants of the
+      operator. (In uniqueMutants, the disallowed mutants are skipped.)
+    sourceFile (string): The source file that was mutated
+    targetArgs ([string]): The targeting arguments passed to TXL (eg: -class,
+      Cache, -syncvar, lock)
+    mutantFile (string): The mutant, eg: tmp/3/4/source/main/net/sf/cache4j/
+      Cache/ASAT/Cache_3_1.java
+    brokenRule (string): The exclusion rule the mutant breaks (See
+      mutantfilter.py), '' if it breaks none, or None if it wasn't checked
+    fingerprint (string): From mutantfilter.fingerprint, or None if the
+      mutant wasn't fingerprinted
+    duplicates (int): How many later mutants of the manifest are the same as
+      this one, and so were left out of uniqueMutants
+  """
+
+  def __init__(self, operator, number, sourceFile, targetArgs, mutantFile):
+    self.operator = operator
+    self.number = number
+    self.sourceFile = sourceFile
+    self.targetArgs = targetArgs
+    self.mutantFile = mutantFile
+    self.brokenRule = None
+    self.fingerprint = None
+    self.duplicates = 0
+
 
 # -----------------------------------------------------------------------------
 #
@@ -73,9 +154,38 @@ def mutate_project(generation, memberNum, mutationOperators):
     destDir = os.path.join(config._TMP_DIR, str(1), str(memberNum),
               config._PROJECT_SRC_DIR.replace(config._PROJECT_DIR, ''))
 
+    forget_mutants(1, memberNum)
+
     if os.path.exists(destDir):
       shutil.rmtree(destDir)
-    shutil.copytree(srcDir, destDir)
+    if os.path.exists(srcDir):
+      shutil.copytree(srcDir, destDir)
+
+    # The packed mutants of member #1
+    packFile = get_pack_file(1, memberNum)
+    if os.path.exists(get_pack_file(1, 1)):
+      if not os.path.exists(os.path.dirname(packFile)):
+        os.makedirs(os.path.dirname(packFile))
+      hardlinks.link_or_copy(get_pack_file(1, 1), packFile)
+
+    # The manifest of member #1, with the mutants in this member's directory
+    _manifests[(1, memberNum)] = []
+    for mutant in _manifests.get((1, 1), []):
+      memberFile = mutant.mutantFile.replace(srcDir, destDir, 1)
+
+      if mutant.mutantFile in _packedMutants:
+        _packedMutants[memberFile] = ((packFile,) +
+                                      _packedMutants[mutant.mutantFile][1:])
+
+      # Not generated yet (See config._LAZY_MUTANTS)
+      if mutant.mutantFile in _mutantSites:
+        _mutantSites[memberFile] = _mutantSites[mutant.mutantFile]
+
+      memberMutant = Mutant(mutant.operator, mutant.number, mutant.sourceFile,
+                            mutant.targetArgs, memberFile)
+      memberMutant.brokenRule = mutant.brokenRule
+      memberMutant.fingerprint = mutant.fingerprint
+      _manifests[(1, memberNum)].append(memberMutant)
 
     return
 
@@ -91,6 +201,7 @@ def mutate_project(generation, memberNum, mutationOperators):
     # input/source/
     sourceDir = config._PROJECT_PRISTINE_SRC_DIR
   else:
+    checkout_local_project(generation - 1, memberNum)
     # tmp/2/4/project/source/
     sourceDir = os.path.join(config._TMP_DIR, str(generation - 1), str(memberNum),
                 'project', codeDir)
@@ -111,8 +222,12 @@ def recursively_mutate_project(generation, memberNum, sourceDir, destDir, mutati
   project.  The source project depends on the generation:
   Gen 1: The source project is the original project from the input directory
   Gen >= 2: Source project is from generation -1, for the same memberNum
-  Most of the work is farmed out to the generate_all_mutants function.
-  These function exists for future flexibility.
+  Most of the work is farmed out to the generate_all_mutants function, which
+  gathers the TXL commands. They are run in parallel by run_txl_commands.
+  The mutants are recorded in the member's manifest as they are found, so the
+  representation is built without walking the mutant directories (See
+  generate_representation), and checked against the exclusion rules while
+  they are on hand (See classify_mutants).
 
   Attributes:
   generation (int): Current generation of the evolutionary strategy
@@ -126,6 +241,13 @@ def recursively_mutate_project(generation, memberNum, sourceDir, destDir, mutati
   #logger.debug("generation, member: {}, {}".format(generation, memberNum))
   #logger.debug("sourceDir    {}".format(sourceDir))
 
+  # The mutants of the previous mutation of this member
+  forget_mutants(generation, memberNum)
+
+  # (operator name, source file, mutant key, mutant directory, TXL commands,
+  # cached mutants) of every source file and operator
+  mutantJobs = []
+
   # tmp/2/4/project/source or input/source/
   for root, dirs, files in os.walk(sourceDir):
 
@@ -172,8 +294,93 @@ def recursively_mutate_project(generation, memberNum, sourceDir, destDir, mutati
         #logger.debug("  reldir:       {}".format(reldir))
         #logger.debug("  localDestDir: {}".format(localDestDir))
 
-        generate_all_mutants(generation, memberNum, sourceFile, localDestDir,
-                             mutationOperators)
+        mutantJobs.extend(generate_all_mutants(generation, memberNum,
+                          sourceFile, localDestDir, mutationOperators))
+
+  # The TXL commands of all files and operators share one pool of workers.
+  # The mutants found in the mutant cache aren't generated (or listed) again.
+  commands = []
+  for operatorName, sourceFile, mutantKey, txlDestDir, txlCommands, \
+    cachedFiles in mutantJobs:
+    if cachedFiles is None:
+      commands.extend(txlCommands)
+
+  if config._LAZY_MUTANTS:
+    # Only list the mutants, see materialise_mutant
+    errors = run_txl_commands([get_sites_command(c) for c in commands])
+  else:
+    errors = run_txl_commands(commands)
+  errors = iter(errors)
+
+  # The manifest, in the order the mutants of each operator are numbered
+  manifest = []
+  counts = {}
+
+  # With config._PACK_MUTANTS, the cached mutants are packed straight from
+  # the mutant cache
+  # mutant file => cached mutant
+  cachedMutants = {}
+
+  for operatorName, sourceFile, mutantKey, txlDestDir, txlCommands, \
+    cachedFiles in mutantJobs:
+    if cachedFiles is not None:
+      mutantFiles = reuse_mutants(mutantKey, txlCommands, txlDestDir,
+                                  cachedFiles)
+      cachedMutants.update((f, c) for f, c in zip(mutantFiles, cachedFiles)
+                           if os.path.exists(c))
+    elif config._LAZY_MUTANTS:
+      mutantFiles = []
+      for command in txlCommands:
+        mutantFiles.extend(find_mutant_sites(command, next(errors), mutantKey))
+      if mutantKey is not None:
+        record_mutants(mutantKey, mutantFiles)
+    else:
+      mutantFiles = []
+      if os.path.exists(txlDestDir):
+        mutantFiles = [os.path.join(txlDestDir, f) for f in
+                       sorted(os.listdir(txlDestDir))]
+      if mutantKey is not None:
+        record_mutants(mutantKey, mutantFiles)
+
+    for mutantFile in mutantFiles:
+      counts[operatorName] = counts.get(operatorName, 0) + 1
+      manifest.append(Mutant(operatorName, counts[operatorName], sourceFile,
+                      find_target_args(txlCommands, mutantFile), mutantFile))
+
+    # Cleanup: Delete empty directories
+    remove_empty_mutant_dir(txlDestDir)
+
+  _manifests[(generation, memberNum)] = manifest
+
+  classify_mutants(manifest, cachedMutants)
+
+  if config._PACK_MUTANTS:
+    pack_mutants(generation, memberNum, cachedMutants)
+
+
+def classify_mutants(manifest, cachedMutants):
+  """Check the mutants of a manifest against the exclusion rules (See
+  mutantfilter.py) and, with config._DEDUP_MUTANTS, fingerprint them. The
+  mutants that weren't generated yet (See config._LAZY_MUTANTS) are checked
+  when they are selected instead (See is_disallowed_mutant), and aren't
+  fingerprinted.
+
+  Attributes:
+  manifest ([Mutant]): The manifest of a member
+  cachedMutants ({string: string}): The mutants to read from the mutant
+    cache instead of the mutant directories (See reuse_mutants)
+  """
+
+  for mutant in manifest:
+    mutantFile = cachedMutants.get(mutant.mutantFile, mutant.mutantFile)
+    if not os.path.exists(mutantFile):
+      continue
+
+    with open(mutantFile) as f:
+      tokens = mutantfilter.tokenize_java(f.read())
+    mutant.brokenRule = mutantfilter.find_broken_rule(tokens) or ''
+    if config._DEDUP_MUTANTS:
+      mutant.fingerprint = mutantfilter.fingerprint(mutant.sourceFile, tokens)
 
 
 def generate_all_mutants(generation, memberNum, sourceFile, destDir, mutationOperators):
@@ -187,12 +394,17 @@ def generate_all_mutants(generation, memberNum, sourceFile, destDir, mutationOpe
 
   #logger.debug("generation, member: {}, {}".format(generation, memberNum))
 
+  mutantJobs = []
+
   for operator in mutationOperators:
     if operator[1]:  # If enabled
 
       #logger.debug("operator:        {}".format(operator))
 
-      generate_mutants(generation, memberNum, operator, sourceFile, destDir)
+      mutantJobs.append((operator[0], sourceFile) + generate_mutants(generation,
+                        memberNum, operator, sourceFile, destDir))
+
+  return mutantJobs
 
 
 def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
@@ -205,6 +417,15 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
   txlOperator (string): One of _MUTATION_ASAT, etc... from config.py
   sourceFile (string): The specific file from the source project we are mutating
   destDir (string): Where the project is being copied to
+
+  Returns:
+  (string, string, [[string]], [string]): The key to cache the mutants under
+    (See get_mutant_key), the directory they are written to, the TXL commands
+    that write them and the mutants found in the mutant cache. The mutant
+    numbers are assigned here, so the commands can be run in any order (See
+    run_txl_commands). If the mutants aren't cached, the cached mutants are
+    None and the commands have to be run. With config._LAZY_MUTANTS, a cached
+    listing is enough, its mutants may not be in the cache yet.
   """
 
   #logger.debug("generation, member: {}, {}".format(generation, memberNum))
@@ -218,17 +439,13 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
   # tmp/3/4/source/main/net/sf/cache4j/Cache/ASAT/
   txlDestDir = os.path.join(destDir, sourceNameOnly, txlOperator[0]) + os.sep
 
-  # If the output directory doesn't exist, create it, otherwise clean subdirectories
-  # arc/tmp/1/1/source/BuggedProgram/ASAS/
-  if os.path.exists(txlDestDir):
-    shutil.rmtree(txlDestDir)
-  os.makedirs(txlDestDir)
-
+  commands = []
   counter = 1
 
   # ----- ASM -----
   if txlOperator is config._MUTATION_ASM:
     if static.do_we_have_CMV():  # Class, method, synchronization variable
+      targets = []
       for lineCMV in static._classMethVar:
 
         # Only make mutants where the variable is within scope of the class
@@ -239,78 +456,51 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
         if sourceNameOnly != lineCMV[-3]:
           continue
 
-        outFile = tempfile.SpooledTemporaryFile()
-        errFile = tempfile.SpooledTemporaryFile()
         mutantSource = sourceNameOnly + "_" + str(counter)
 
-        process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
-                'ASM_CMV.Txl', '-', '-outfile', mutantSource, '-outdir',
-                txlDestDir, '-class', lineCMV[-3], '-method', lineCMV[-2],
-                '-syncvar', lineCMV[-1]], stdout=outFile,
-                stderr=errFile, cwd=config._PROJECT_DIR, shell=False)
-        process.wait()
-
-        # Note to self: Keep this snipped for debugging purposes
-        #
-        # outFile.seek(0)
-        # errFile.seek(0)
-        # output = outFile.read()
-        # error = errFile.read()
-        # outFile.close()
-        # errFile.close()
-        # logger.debug("Mutant generation, Output text:\n")
-        # logger.debug(output)
-        # logger.debug("Mutant generation, Error text:\n")
-        # logger.debug(error)
+        targets.append((mutantSource, ['-class', lineCMV[-3], '-method',
+                        lineCMV[-2], '-syncvar', lineCMV[-1]]))
 
         counter += 1
 
+      commands.extend(targeted_txl_commands(sourceFile, config._TXL_DIR +
+                      'ASM_CMV.Txl', txlDestDir, targets))
 
     #  We have class, variable information
     if static.do_we_have_CV():  # Class, synchronization variable
+      targets = []
       for lineCV in static._classVar:
         if sourceNameOnly != lineCV[-2]:
           continue
 
         mutantSource = sourceNameOnly + "_" + str(counter)
-        outFile = tempfile.SpooledTemporaryFile()
-        errFile = tempfile.SpooledTemporaryFile()
 
-        process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
-                'ASM_CV.Txl', '-', '-outfile', mutantSource, '-outdir',
-                txlDestDir, '-class', lineCV[-2], '-syncvar', lineCV[-1]],
-                stdout=outFile, stderr=errFile, cwd=config._PROJECT_DIR,
-                shell=False)
-        process.wait()
+        targets.append((mutantSource, ['-class', lineCV[-2], '-syncvar',
+                        lineCV[-1]]))
 
         counter += 1
 
+      commands.extend(targeted_txl_commands(sourceFile, config._TXL_DIR +
+                      'ASM_CV.Txl', txlDestDir, targets))
+
     # No targeting information, so fall back on the 'this' variable
     if not static.do_we_have_CV and not static.do_we_have_CMV:
-      outFile = tempfile.SpooledTemporaryFile()
-      errFile = tempfile.SpooledTemporaryFile()
       mutantSource = sourceNameOnly + "_" + str(counter)
 
-      process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
+      commands.append(['txl', sourceFile, config._TXL_DIR +
               'ASM_V.Txl', '-', '-outfile', mutantSource, '-outdir',
-              txlDestDir, '-syncvar', 'this'], stdout=outFile,
-              stderr=errFile, cwd=config._PROJECT_DIR, shell=False)
-      process.wait()
+              txlDestDir, '-syncvar', 'this'])
 
       counter += 1
 
   # ----- ASIM -----
   # I don't think much is gained by using ASIM_C.txt or ASIM_CM.txl
   elif txlOperator is config._MUTATION_ASIM:
-    outFile = tempfile.SpooledTemporaryFile()
-    errFile = tempfile.SpooledTemporaryFile()
     mutantSource = sourceNameOnly + "_" + str(counter)
 
-    process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
+    commands.append(['txl', sourceFile, config._TXL_DIR +
             'ASIM_RND.Txl', '-', '-outfile', mutantSource, '-outdir',
-            txlDestDir,], stdout=outFile, stderr=errFile,
-            cwd=config._PROJECT_DIR, shell=False)
-    process.wait()
+            txlDestDir,])
 
     counter += 1
 
@@ -318,6 +508,7 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
   elif txlOperator is config._MUTATION_ASAT:
     # Case 1: We have the (class, method, variable) triples
     if static.do_we_have_CMV():
+      targets = []
       for lineCMV in static._classMethVar:
         if sourceNameOnly != lineCMV[-3]:
           continue
@@ -326,20 +517,17 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
           syncVar = lineCMV2[-1]
 
           mutantSource = sourceNameOnly + "_" + str(counter)
-          outFile = tempfile.SpooledTemporaryFile()
-          errFile = tempfile.SpooledTemporaryFile()
 
-          process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
-                  'ASAT_CMV.Txl', '-', '-outfile', mutantSource, '-outdir',
-                  txlDestDir, '-class', lineCMV[-3], '-method', lineCMV[-2],
-                  '-var', lineCMV[-1], '-syncvar', syncVar],
-                  stdout=outFile, stderr=errFile, cwd=config._PROJECT_DIR,
-                  shell=False)
-          process.wait()
+          targets.append((mutantSource, ['-class', lineCMV[-3], '-method',
+                          lineCMV[-2], '-var', lineCMV[-1], '-syncvar', syncVar]))
 
           counter += 1
 
+      commands.extend(targeted_txl_commands(sourceFile, config._TXL_DIR +
+                      'ASAT_CMV.Txl', txlDestDir, targets))
+
     if static.do_we_have_CV():
+      targets = []
       for lineCV in static._classVar:
         #logger.debug("ASAT_CV: Comparing {} to {}".format(sourceNameOnly, lineCV[-2]))
         if sourceNameOnly != lineCV[-2]:
@@ -351,30 +539,23 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
           #logger.debug("class, var, sync: {}, {}, {}".format(lineCV[-2],\
           #  lineCV[-1], lineCV2[-1]))
           mutantSource = sourceNameOnly + "_" + str(counter)
-          outFile = tempfile.SpooledTemporaryFile()
-          errFile = tempfile.SpooledTemporaryFile()
 
-          # Different operator when 2 args are available
-          process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
-                  'ASAT_CV.Txl', '-', '-outfile', mutantSource, '-outdir',
-                  txlDestDir, '-class', lineCV[-2], '-var', lineCV[-1],
-                  '-syncvar', syncVar], stdout=outFile, stderr=errFile,
-                  cwd=config._PROJECT_DIR, shell=False)
-          process.wait()
+          targets.append((mutantSource, ['-class', lineCV[-2], '-var',
+                          lineCV[-1], '-syncvar', syncVar]))
 
           counter += 1
 
+      # Different operator when 2 args are available
+      commands.extend(targeted_txl_commands(sourceFile, config._TXL_DIR +
+                      'ASAT_CV.Txl', txlDestDir, targets))
+
     # Case 3: No targeting information for ASAT. Fall back on the 'this' variable
     if not static.do_we_have_CV and not static.do_we_have_CMV:
       mutantSource = sourceNameOnly + "_" + str(counter)
-      outFile = tempfile.SpooledTemporaryFile()
-      errFile = tempfile.SpooledTemporaryFile()
 
-      process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
+      commands.append(['txl', sourceFile, config._TXL_DIR +
                 'ASAT_RND.Txl', '-', '-outfile', mutantSource, '-outdir',
-                txlDestDir, '-syncvar', 'this'], stdout=outFile,
-                stderr=errFile, cwd=config._PROJECT_DIR, shell=False)
-      process.wait()
+                txlDestDir, '-syncvar', 'this'])
 
       counter += 1
 
@@ -383,25 +564,715 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
   # used in concurrency.  (The txl invocation doesn't use the -class, etc.. args)
   else:
     mutantSource = sourceNameOnly + "_" + str(counter)
+
+    commands.append(['txl', sourceFile, txlOperator[4], '-',
+              '-outfile', mutantSource, '-outdir', txlDestDir])
+
+    counter += 1
+
+  # Only mutate files that haven't been mutated before (See mutantcache.py)
+  mutantKey = None
+  cachedFiles = None
+  if config._INCREMENTAL_MUTANTS:
+    mutantKey = get_mutant_key(txlOperator, sourceFile)
+    cachedFiles = mutantcache.find_mutants(mutantKey, config._LAZY_MUTANTS)
+
+  # If the output directory doesn't exist, create it, otherwise clean subdirectories
+  # arc/tmp/1/1/source/BuggedProgram/ASAS/
+  if os.path.exists(txlDestDir):
+    shutil.rmtree(txlDestDir)
+  if cachedFiles is None and not config._LAZY_MUTANTS:
+    os.makedirs(txlDestDir)
+
+  return mutantKey, txlDestDir, commands, cachedFiles
+
+
+def get_mutant_key(txlOperator, sourceFile):
+  """Hash what decides the mutants of a source file for an operator: the
+  name and contents of the file, the operator, the TXL programs it uses and,
+  for the targeted operators (ASAT and ASM), the class, method and variable
+  targets passed to TXL.
+
+  Attributes:
+  txlOperator (string): One of _MUTATION_ASAT, etc... from config.py
+  sourceFile (string): The file being mutated
+
+  Returns:
+  string: The key of the mutants
+  """
+
+  SHAhash = hashlib.sha1()
+  SHAhash.update(os.path.basename(sourceFile))
+  SHAhash.update(hashlist.hash_file(sourceFile))
+  SHAhash.update(txlOperator[0])
+
+  # The TXL programs generate_mutants may use for the operator
+  if txlOperator is config._MUTATION_ASM:
+    txlFiles = ['ASM_CMV.Txl', 'ASM_CV.Txl', 'ASM_V.Txl']
+  elif txlOperator is config._MUTATION_ASAT:
+    txlFiles = ['ASAT_CMV.Txl', 'ASAT_CV.Txl', 'ASAT_RND.Txl']
+  elif txlOperator is config._MUTATION_ASIM:
+    txlFiles = ['ASIM_RND.Txl']
+  else:
+    txlFiles = [txlOperator[4]]
+
+  for txlFile in txlFiles:
+    txlFile = os.path.join(config._TXL_DIR, txlFile)
+    if txlFile not in _programHashes:
+      _programHashes[txlFile] = hash_txl_program(txlFile)
+    SHAhash.update(_programHashes[txlFile])
+
+  if txlOperator is config._MUTATION_ASM or txlOperator is config._MUTATION_ASAT:
+    SHAhash.update(repr((static._classMethVar, static._classVar)))
+
+  return SHAhash.hexdigest()
+
+
+def record_mutants(mutantKey, mutantFiles):
+  """Add the mutants written by the TXL commands of a key to the mutant cache,
+  so they can be reused by reuse_mutants. With config._LAZY_MUTANTS, the
+  mutants were only listed, and are added as they are generated (See
+  materialise_mutant).
+
+  Attributes:
+  mutantKey (string): From get_mutant_key
+  mutantFiles ([string]): The mutants, in the directory from generate_mutants
+  """
+
+  mutantcache.add_mutants(mutantKey, mutantFiles, config._LAZY_MUTANTS)
+
+
+def reuse_mutants(mutantKey, commands, txlDestDir, cachedFiles):
+  """If an identical source file was mutated before, by any member, generation
+  or run of ARC, link its mutants from the mutant cache into txlDestDir
+  instead of running TXL again. With config._PACK_MUTANTS, they are packed
+  from the cache instead (See pack_mutants). The mutants of a cached listing
+  that aren't in the cache yet are generated when they are needed, as if they
+  were listed by TXL (See find_mutant_sites).
+
+  Attributes:
+  mutantKey (string): From get_mutant_key
+  commands ([[string]]): TXL commands from generate_mutants
+  txlDestDir (string): Directory from generate_mutants
+  cachedFiles ([string]): The cached mutants, from generate_mutants
+
+  Returns:
+  [string]: The mutants, in txlDestDir
+  """
+
+  mutantFiles = []
+
+  for cachedFile in cachedFiles:
+    # tmp/3/4/source/main/net/sf/cache4j/Cache/ASAT/Cache_3_1.java
+    mutantFile = os.path.join(txlDestDir, os.path.basename(cachedFile))
+    mutantFiles.append(mutantFile)
+
+    if not os.path.exists(cachedFile):
+      add_mutant_site(find_command(commands, mutantFile), mutantFile, mutantKey)
+      continue
+
+    if config._PACK_MUTANTS:
+      continue
+
+    if not os.path.exists(txlDestDir):
+      os.makedirs(txlDestDir)
+    hardlinks.link_or_copy(cachedFile, mutantFile)
+
+  return mutantFiles
+
+
+def targeted_txl_commands(sourceFile, txlFile, txlDestDir, targets):
+  """Make the TXL commands that mutate a file for each target of a targeted
+  operator (ASAT_CMV.Txl, ASAT_CV.Txl, ASM_CMV.Txl or ASM_CV.Txl). With
+  config._TXL_BATCH_TARGETS, a single command mutates all of the targets, so
+  the file is only parsed once (See BatchTargets.Txl). Either way the mutants
+  and their numbering are meant to be the same (See tests/test_txl_modes.py).
+
+  Attributes:
+  sourceFile (string): The file being mutated
+  txlFile (string): The targeted TXL operator
+  txlDestDir (string): Where the mutants are written
+  targets ([(string, [string])]): The mutant file name prefix (eg: Cache_3)
+    and the targeting arguments (eg: -class, Cache, -syncvar, lock) of
+    each target
+
+  Returns:
+  [[string]]: TXL commands
+  """
+
+  if not targets:
+    return []
+
+  if config._TXL_BATCH_TARGETS:
+    command = ['txl', sourceFile, txlFile, '-', '-outdir', txlDestDir]
+    for mutantSource, targetArgs in targets:
+      command.extend(['-target', mutantSource] + targetArgs)
+    return [command]
+
+  return [['txl', sourceFile, txlFile, '-', '-outfile', mutantSource, '-outdir',
+          txlDestDir] + targetArgs for mutantSource, targetArgs in targets]
+
+
+def run_txl_commands(commands):
+  """Run the TXL commands that generate mutants, up to config._MAX_CORES of
+  them at a time. Each command writes its own numbered mutant files, so the
+  mutants and their numbering are the same as when they are run one by one.
+
+  A command that fails with a compiled TXL program (See get_txl_command) is
+  run again with the TXL source. If that works, the compiled program isn't
+  used again.
+
+  Attributes:
+  commands ([[string]]): TXL commands from generate_mutants
+
+  Returns:
+  [string]: The error text (stderr) of each command
+  """
+
+  txlCommands = [get_txl_command(command) for command in commands]
+  returnCodes, errors = launch_txl_commands(txlCommands)
+
+  # The commands that failed with a compiled TXL program
+  failed = [i for i in xrange(len(commands)) if txlCommands[i] != commands[i]
+            and txl_failed(returnCodes[i], errors[i])]
+  if not failed:
+    return errors
+
+  retryCodes, retryErrors = launch_txl_commands([commands[i] for i in failed])
+  for i, returnCode, error in zip(failed, retryCodes, retryErrors):
+    errors[i] = error
+    if txl_failed(returnCode, error):
+      continue
+
+    for arg in commands[i]:
+      if arg.endswith('.Txl') and _compiledPrograms.get(arg, arg) != arg:
+        logger.warning("TXL could not load the compiled program {}, using {}"
+                       .format(_compiledPrograms[arg], arg))
+        _compiledPrograms[arg] = arg
+
+  return errors
+
+
+def launch_txl_commands(commands):
+  """Run TXL commands as they are, up to config._MAX_CORES of them at a time
+  (See run_txl_commands).
+
+  Attributes:
+  commands ([[string]]): TXL commands
+
+  Returns:
+  ([int], [string]): The return code and the error text (stderr) of each
+    command
+  """
+
+  processes = []
+  errFiles = []
+
+  for command in commands:
+    # Wait for a free core
+    while len(processes) - len([p for p in processes if p.poll() is not None]) \
+      >= config._MAX_CORES:
+      time.sleep(0.01)
+
     outFile = tempfile.SpooledTemporaryFile()
     errFile = tempfile.SpooledTemporaryFile()
 
-    process = subprocess.Popen(['txl', sourceFile, txlOperator[4], '-',
-              '-outfile', mutantSource, '-outdir', txlDestDir],
-              stdout=outFile, stderr=errFile, cwd=config._PROJECT_DIR, shell=False)
+    processes.append(subprocess.Popen(command, stdout=outFile, stderr=errFile,
+                     cwd=config._PROJECT_DIR, shell=False))
+    errFiles.append(errFile)
+
+    # Note to self: Keep this snipped for debugging purposes
+    #
+    # process.wait()
+    # outFile.seek(0)
+    # errFile.seek(0)
+    # output = outFile.read()
+    # error = errFile.read()
+    # outFile.close()
+    # errFile.close()
+    # logger.debug("Mutant generation, Output text:\n")
+    # logger.debug(output)
+    # logger.debug("Mutant generation, Error text:\n")
+    # logger.debug(error)
+
+  for process in processes:
     process.wait()
 
-    counter += 1
+  errors = []
+  for errFile in errFiles:
+    errFile.seek(0)
+    errors.append(errFile.read())
+    errFile.close()
+
+  return [process.returncode for process in processes], errors
+
+
+def get_txl_command(command):
+  """Use the compiled TXL programs (See get_txl_program) in a TXL command.
+  txl loads a compiled program with -l.
+
+  Attributes:
+  command ([string]): TXL command from generate_mutants
+
+  Returns:
+  [string]: The TXL command, or command if no program was compiled
+  """
+
+  txlCommand = [get_txl_program(arg) if arg.endswith('.Txl') else arg
+                for arg in command]
+  if txlCommand == command:
+    return command
+
+  # txl -l Cache.java ASAT_CV_3f2a....ctxl - -outfile ...
+  return txlCommand[:1] + ['-l'] + txlCommand[1:]
+
+
+def txl_failed(returnCode, errText):
+  """Did a TXL command fail? txl reports errors as TXLnnnnE."""
+
+  return returnCode != 0 or re.search(r'TXL\d+E', errText) is not None
+
+
+def get_sites_command(command):
+  """Turn a TXL command from generate_mutants into one that only lists the
+  mutants it would generate (See WriteMutants.Txl). Every target of a
+  batched command (See BatchTargets.Txl) gets the -sites argument.
+
+  Attributes:
+  command ([string]): TXL command from generate_mutants
+
+  Returns:
+  [string]: The TXL command
+  """
+
+  sitesCommand = []
+  for i in xrange(len(command)):
+    sitesCommand.append(command[i])
+    if i > 0 and command[i - 1] == '-target':
+      sitesCommand.append('-sites')
+
+  if '-outfile' in command:
+    sitesCommand.append('-sites')
+
+  return sitesCommand
+
+
+def find_mutant_sites(command, errText, mutantKey):
+  """Find the mutants listed by the sites command of a TXL command, and
+  remember how to generate each of them.
+
+  Attributes:
+  command ([string]): TXL command from generate_mutants
+  errText (string): The error text of its sites command, holding the name of
+    each mutant (eg: Cache_3_1.java)
+  mutantKey (string): The key to add the mutants to the mutant cache under
+    once they are generated, or None
+
+  Returns:
+  [string]: The mutant files the TXL command would generate
+  """
+
+  # tmp/3/4/source/main/net/sf/cache4j/Cache/ASAT/
+  txlDestDir = command[command.index('-outdir') + 1]
+
+  # Cache_3, Cache_4, ...
+  mutantSources = [command[i + 1] for i in xrange(len(command) - 1)
+                   if command[i] in ('-outfile', '-target')]
+
+  mutantFiles = []
+  for line in errText.splitlines():
+    # "Cache_3_1.java"
+    match = re.match(r'^"?((.+)_\d+\.java)"?$', line.strip())
+    if match is None or match.group(2) not in mutantSources:
+      continue
+
+    mutantFile = os.path.join(txlDestDir, match.group(1))
+    add_mutant_site(command, mutantFile, mutantKey)
+    mutantFiles.append(mutantFile)
+
+  return mutantFiles
+
+
+def add_mutant_site(command, mutantFile, mutantKey):
+  """Remember how to generate a listed mutant (See materialise_mutant).
+
+  Attributes:
+  command ([string]): TXL command from generate_mutants that generates it
+  mutantFile (string): The mutant (eg: .../Cache/ASAT/Cache_3_1.java)
+  mutantKey (string): From get_mutant_key, or None
+  """
+
+  # Cache_3_1.java -> Cache_3
+  mutantSource = re.sub(r'_\d+\.java$', '', os.path.basename(mutantFile))
+
+  _mutantSites[mutantFile] = (command[1], command[2], mutantSource,
+                              get_target_args(command, mutantSource), mutantKey)
+
+
+def get_target_args(command, mutantSource):
+  """Find the targeting arguments (eg: -class, Cache, -syncvar, lock) of a
+  target in a TXL command from generate_mutants.
+
+  Attributes:
+  command ([string]): TXL command from generate_mutants
+  mutantSource (string): The mutant file prefix of the target (eg: Cache_3)
+
+  Returns:
+  [string]: The targeting arguments
+  """
+
+  # txl Cache.java RSM.Txl - -outfile Cache_3 -outdir ... [target args]
+  if '-outfile' in command:
+    return command[command.index('-outdir') + 2:]
+
+  # txl Cache.java ASM_CV.Txl - -outdir ... -target Cache_3 [target args]
+  #   -target Cache_4 ...
+  for i in xrange(len(command) - 1):
+    if command[i] == '-target' and command[i + 1] == mutantSource:
+      targetArgs = command[i + 2:]
+      if '-target' in targetArgs:
+        targetArgs = targetArgs[:targetArgs.index('-target')]
+      return targetArgs
+
+  return []
+
+
+def find_target_args(commands, mutantFile):
+  """Find the targeting arguments of the TXL command that generates a mutant.
+
+  Attributes:
+  commands ([[string]]): TXL commands from generate_mutants
+  mutantFile (string): The mutant (eg: .../Cache/ASAT/Cache_3_1.java)
+
+  Returns:
+  [string]: The targeting arguments, or None if no command generates it
+  """
+
+  command = find_command(commands, mutantFile)
+  if command is None:
+    return None
+
+  # Cache_3_1.java -> Cache_3
+  return get_target_args(command, re.sub(r'_\d+\.java$', '',
+                         os.path.basename(mutantFile)))
+
+
+def find_command(commands, mutantFile):
+  """Find the TXL command that generates a mutant.
+
+  Attributes:
+  commands ([[string]]): TXL commands from generate_mutants
+  mutantFile (string): The mutant (eg: .../Cache/ASAT/Cache_3_1.java)
+
+  Returns:
+  [string]: The TXL command, or None if no command generates it
+  """
+
+  # Cache_3_1.java -> Cache_3
+  mutantSource = re.sub(r'_\d+\.java$', '', os.path.basename(mutantFile))
+
+  for command in commands:
+    if mutantSource in command:
+      return command
+
+  return None
+
+
+def materialise_mutant(mutantFile):
+  """Generate a mutant that was only listed when the project was mutated (See
+  config._LAZY_MUTANTS). Only this mutant is written. It is taken from the
+  mutant cache if it was generated before, and added to it otherwise. With
+  config._PACK_MUTANTS, it is added to its member's pack file instead of
+  being left in the mutant directory.
+
+  Attributes:
+  mutantFile (string): The mutant, from uniqueMutants
+  """
+
+  if os.path.exists(mutantFile) or mutantFile in _packedMutants or \
+    mutantFile not in _mutantSites:
+    return
+
+  sourceFile, txlFile, mutantSource, targetArgs, mutantKey = \
+    _mutantSites[mutantFile]
+
+  # Another member may have generated it since it was listed
+  cachedFile = None
+  if mutantKey is not None:
+    cachedFile = os.path.join(mutantcache.get_cache_dir(), mutantKey,
+                              os.path.basename(mutantFile))
+  if cachedFile is not None and os.path.exists(cachedFile):
+    if config._PACK_MUTANTS:
+      add_to_pack(mutantFile, cachedFile)
+    else:
+      if not os.path.exists(os.path.dirname(mutantFile)):
+        os.makedirs(os.path.dirname(mutantFile))
+      hardlinks.link_or_copy(cachedFile, mutantFile)
+    return
+
+  # Cache_3_2.java -> 2
+  mutantNum = re.search(r'_(\d+)\.java$', mutantFile).group(1)
+
+  # tmp/3/4/source/main/net/sf/cache4j/Cache/ASAT/ or, to be packed, a
+  # directory of its own in tmp/3/4/
+  if config._PACK_MUTANTS:
+    packFile = find_pack_file(mutantFile)
+    if not os.path.exists(os.path.dirname(packFile)):
+      os.makedirs(os.path.dirname(packFile))
+    txlDestDir = tempfile.mkdtemp(dir=os.path.dirname(packFile)) + os.sep
+  else:
+    txlDestDir = os.path.dirname(mutantFile) + os.sep
+    if not os.path.exists(txlDestDir):
+      os.makedirs(txlDestDir)
+  generatedFile = os.path.join(txlDestDir, os.path.basename(mutantFile))
+
+  run_txl_commands([['txl', sourceFile, txlFile, '-', '-outfile', mutantSource,
+                   '-outdir', txlDestDir] + targetArgs + ['-only', mutantNum]])
+
+  if not os.path.exists(generatedFile):
+    logger.error("TXL did not generate the mutant {}".format(mutantFile))
+  else:
+    if mutantKey is not None:
+      mutantcache.add_mutant_file(mutantKey, generatedFile)
+    if config._PACK_MUTANTS:
+      add_to_pack(mutantFile, generatedFile)
+
+  if config._PACK_MUTANTS:
+    shutil.rmtree(txlDestDir)
 
 
-  # Cleanup: Delete empty directories
+def get_pack_file(generation, memberNum):
+  """The pack file of a member's mutants, eg: tmp/3/4/mutants.pack"""
+
+  return os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+                      'mutants.pack')
+
+
+def find_pack_file(mutantFile):
+  """The pack file of the member a mutant belongs to
+
+  Attributes:
+  mutantFile (string): The mutant, eg: tmp/3/4/source/main/net/sf/cache4j/
+    Cache/ASAT/Cache_3_1.java
+
+  Returns:
+  string: The pack file, eg: tmp/3/4/mutants.pack
+  """
+
+  # 3, 4, source, ...
+  relParts = os.path.relpath(mutantFile, config._TMP_DIR).split(os.sep)
+
+  return get_pack_file(relParts[0], relParts[1])
+
+
+def pack_mutants(generation, memberNum, cachedMutants):
+  """Move the mutants in a member's manifest into its pack file, one
+  compressed record per mutant, and delete the mutant directories. The
+  mutants keep their file names in uniqueMutants (See read_mutant).
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are mutating
+  cachedMutants ({string: string}): The mutants to read from the mutant
+    cache instead of the mutant directories (See reuse_mutants)
+  """
+
+  # tmp/3/4/source/
+  sourceDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+              config._PROJECT_SRC_DIR.replace(config._PROJECT_DIR, ''))
+  packFile = get_pack_file(generation, memberNum)
+
+  if not os.path.exists(os.path.dirname(packFile)):
+    os.makedirs(os.path.dirname(packFile))
+
+  with open(packFile, 'wb') as pack:
+    for mutant in _manifests.get((generation, memberNum), []):
+      mutantFile = cachedMutants.get(mutant.mutantFile, mutant.mutantFile)
+
+      # Not generated yet (See config._LAZY_MUTANTS)
+      if not os.path.exists(mutantFile):
+        continue
+
+      with open(mutantFile, 'rb') as f:
+        record = zlib.compress(f.read())
+
+      _packedMutants[mutant.mutantFile] = (packFile, pack.tell(), len(record))
+      pack.write(record)
+
+  if os.path.exists(sourceDir):
+    deleter.delete(sourceDir)
+
+
+def add_to_pack(mutantFile, generatedFile):
+  """Append a mutant that was generated after its member's mutants were packed
+  (See materialise_mutant) to the pack file.
+
+  The pack file of a member of generation 1 may be hard linked to the pack
+  files of the other members (See mutate_project). Appending leaves their
+  records where they are, so it isn't copied first.
+
+  Attributes:
+  mutantFile (string): The mutant, from uniqueMutants
+  generatedFile (string): Where its contents are, eg: in the mutant cache
+  """
+
+  packFile = find_pack_file(mutantFile)
+
+  with open(generatedFile, 'rb') as f:
+    record = zlib.compress(f.read())
+
+  with open(packFile, 'ab') as pack:
+    pack.seek(0, os.SEEK_END)
+    _packedMutants[mutantFile] = (packFile, pack.tell(), len(record))
+    pack.write(record)
+
+
+def forget_mutants(generation, memberNum):
+  """Remove a member's manifest, its mutants from the pack and lazy mutant
+  indexes, and its pack file.
+
+  Attributes:
+  generation (int): Generation of the member
+  memberNum (int): Which member of the population
+  """
+
+  for mutant in _manifests.pop((generation, memberNum), []):
+    _packedMutants.pop(mutant.mutantFile, None)
+    _mutantSites.pop(mutant.mutantFile, None)
+    _uncheckedMutants.discard(mutant.mutantFile)
+  duplicateMutants.pop((generation, memberNum), None)
+
+  packFile = get_pack_file(generation, memberNum)
+  if os.path.exists(packFile):
+    os.remove(packFile)
+
+
+def read_mutant(mutantFile):
+  """Read a mutant, from its member's pack file if it was packed. Mutants that
+  were only listed are generated first (See materialise_mutant). Other files
+  are read as they are.
+
+  Attributes:
+  mutantFile (string): The mutant, from uniqueMutants
+
+  Returns:
+  string: The contents of the mutant
+  """
+
+  materialise_mutant(mutantFile)
+
+  if mutantFile in _packedMutants:
+    packFile, offset, length = _packedMutants[mutantFile]
+    with open(packFile, 'rb') as pack:
+      pack.seek(offset)
+      return zlib.decompress(pack.read(length))
+
+  with open(mutantFile) as f:
+    return f.read()
+
+
+def get_txl_program(txlFile):
+  """Find the compiled form of a TXL program, compiling it if needed. Without
+  it, txl parses and compiles the Java grammar on every invocation.
+
+  The compiled program is kept in config._TXL_COMPILED_DIR under the hash of
+  the program and the files it includes, so it is only compiled again when
+  one of them changes.
+
+  Attributes:
+  txlFile (string): TXL program, eg: config._TXL_DIR + 'ASM_CMV.Txl'
+
+  Returns:
+  string: The compiled program, or txlFile if it can't be compiled or txl
+    couldn't load it (See run_txl_commands)
+  """
+
+  if not config._TXL_PRECOMPILE:
+    return txlFile
+
+  if txlFile in _compiledPrograms:
+    return _compiledPrograms[txlFile]
+
+  programName = os.path.splitext(os.path.basename(txlFile))[0]
+  compiledFile = os.path.join(config._TXL_COMPILED_DIR, programName + '_' +
+                              hash_txl_program(txlFile) + '.ctxl')
+
+  if not os.path.exists(compiledFile):
+    if not os.path.exists(config._TXL_COMPILED_DIR):
+      os.makedirs(config._TXL_COMPILED_DIR)
+
+    # txl -c writes Program.ctxl to the current directory
+    compileDir = tempfile.mkdtemp(dir=config._TXL_COMPILED_DIR)
+    outFile = tempfile.SpooledTemporaryFile()
+    errFile = tempfile.SpooledTemporaryFile()
+    process = subprocess.Popen(['txl', '-c', '-i', os.path.dirname(txlFile),
+              txlFile], stdout=outFile, stderr=errFile, cwd=compileDir,
+              shell=False)
+    process.wait()
+
+    ctxlFile = os.path.join(compileDir, programName + '.ctxl')
+    if process.returncode == 0 and os.path.exists(ctxlFile):
+      os.rename(ctxlFile, compiledFile)
+    else:
+      errFile.seek(0)
+      logger.warning("Could not compile TXL program {}, using the source:\n{}"
+                     .format(txlFile, errFile.read()))
+      compiledFile = txlFile
+    shutil.rmtree(compileDir)
+
+  _compiledPrograms[txlFile] = compiledFile
+  return compiledFile
+
+
+def hash_txl_program(txlFile):
+  """Return the sha1 hash of a TXL program and the files it includes (eg:
+  Java.Grm). The included files are found in the directory of the program.
+
+  Attributes:
+  txlFile (string): TXL program
+
+  Returns:
+  string: The hash
+  """
+
+  SHAhash = hashlib.sha1()
+  toHash = [txlFile]
+  hashed = set()
+
+  while toHash:
+    aFile = toHash.pop(0)
+    if aFile in hashed or not os.path.exists(aFile):
+      continue
+    hashed.add(aFile)
+
+    with open(aFile, 'rb') as f:
+      contents = f.read()
+    SHAhash.update(contents)
+
+    # include "Java.Grm"
+    for include in re.findall(r'^\s*include\s+"([^"]+)"', contents, re.M):
+      toHash.append(os.path.join(os.path.dirname(txlFile), include))
+
+  return SHAhash.hexdigest()
+
+
+def remove_empty_mutant_dir(txlDestDir):
+  """Delete the mutant directory of an operator if no mutants were written to
+  it, and the directory of the source file if it is left empty too.
+
+  Attributes:
+  txlDestDir (string): Directory from generate_mutants
+  """
+
   # tmp/3/4/source/main/net/sf/cache4j/Cache/ASAT
-  if sum((len(f) for _, _, f in os.walk(txlDestDir))) == 0:
+  if os.path.exists(txlDestDir) and \
+    sum((len(f) for _, _, f in os.walk(txlDestDir))) == 0:
     shutil.rmtree(txlDestDir)
 
   # tmp/3/4/source/main/net/sf/cache4j/Cache
-  sourceDestDir = os.path.join(destDir, sourceNameOnly)
-  if sum((len(f) for _, _, f in os.walk(sourceDestDir))) == 0:
+  sourceDestDir = os.path.dirname(os.path.normpath(txlDestDir))
+  if os.path.exists(sourceDestDir) and \
+    sum((len(f) for _, _, f in os.walk(sourceDestDir))) == 0:
     shutil.rmtree(sourceDestDir)
 
 
@@ -411,7 +1282,16 @@ def generate_representation(generation, memberNum, mutationOperators):
   Returns a list ints where each int corresponds to the number of mutations
   of one type.  eg: {5, 7, 3, ...} = 5 of type ASAT, 7 of type ...
   The order of the mutation types is the same as that in the two
-  config.**_MUTATIONS.
+  config.**_MUTATIONS. The mutants are taken from the member's manifest
+  (See recursively_mutate_project). Mutants that break an exclusion rule
+  (See classify_mutants) are left out, so they are never selected. So are
+  duplicates of an earlier mutant, with config._DEDUP_MUTANTS.
+
+  With config._LAZY_MUTANTS (off by default), the mutants that weren't
+  generated yet can't be classified here. They are given a place in the
+  representation, checked when they are selected (See is_disallowed_mutant)
+  and never treated as duplicates, so the representation can be larger than
+  with the mutants generated up front.
 
   Attributes:
   generation (int): Current generation of the evolutionary strategy
@@ -429,43 +1309,51 @@ def generate_representation(generation, memberNum, mutationOperators):
 
   #logger.debug("Representation 1: {}".format(rep))
 
-  # Recusive dir walk       tmp/1/1/source/
-  recurDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum),
-                          config._PROJECT_SRC_DIR.replace(config._PROJECT_DIR, ''))
-
-  return recursive_generate_representation(generation, memberNum, recurDir, rep, mutationOperators)
+  excluded = 0
+  duplicateMutants[(generation, memberNum)] = 0
 
+  # fingerprint => the first mutant with it
+  fingerprints = {}
 
-def recursive_generate_representation(generation, memberNum, recDir, representation, mutationOperators):
-  """See the documentation for generate_representation
-  """
+  for mutant in _manifests.get((generation, memberNum), []):
+    if mutant.operator not in rep:
+      continue
 
-  for root, dirs, files in os.walk(recDir):
+    # Mutants that weren't generated yet (See config._LAZY_MUTANTS) are
+    # checked when they are selected, and aren't fingerprinted
+    if mutant.brokenRule:
+      excluded += 1
+      continue
 
-    #for aDir in dirs:
-      #logger.debug("Dir:  {}".format(aDir))
-      #representation = recursive_generate_representation(generation, memberNum,
-      #                  os.path.join(recDir, aDir), representation, mutationOperators)
+    mutant.duplicates = 0
+    if mutant.fingerprint is not None:
+      if mutant.fingerprint in fingerprints:
+        fingerprints[mutant.fingerprint].duplicates += 1
+        duplicateMutants[(generation, memberNum)] += 1
+        continue
+      fingerprints[mutant.fingerprint] = mutant
 
-    for aFile in files:
-      # Find the operator
-      for mutationOp in mutationOperators:
+    if mutant.brokenRule is None:
+      _uncheckedMutants.add(mutant.mutantFile)
 
-        representation[mutationOp[0]] += 1
-        # uniqueMutants at {1, 1, ASAT, 1} = /home/david/workspace
-        #  /arc/tmp/1/1/Account/ASAT/ASAT_Account_1.java_1
-        #logger.debug("uniqueMutants at {}, {}, {}, {} = {}".format(generation,
-        #           memberNum, mutationOp[0], rep[mutationOp[0]],
-        #           os.path.join(root, aDir)))
-        uniqueMutants[(generation, memberNum, mutationOp[0],
-                    representation[mutationOp[0]])] = os.path.join(root, aFile)
+    rep[mutant.operator] += 1
+    # uniqueMutants at {1, 1, ASAT, 1} = /home/david/workspace
+    #  /arc/tmp/1/1/source/Account/ASAT/Account_1_1.java
+    uniqueMutants[(generation, memberNum, mutant.operator,
+                   rep[mutant.operator])] = mutant.mutantFile
 
-        # Representation: {'RSM': 0, 'ASIM': 4, 'ASAT': 5, ...
-        #logger.debug("Representation at file step: {}".format(representation))
+  if excluded > 0:
+    logger.debug("Excluded {} disallowed mutants from member {} at generation {}"
+                 .format(excluded, memberNum, generation))
+  if duplicateMutants[(generation, memberNum)] > 0:
+    logger.debug("Excluded {} duplicate mutants from member {} at generation {}"
+                 .format(duplicateMutants[(generation, memberNum)], memberNum,
+                 generation))
 
-  #logger.debug("Representation at end: {}".format(representation))
+  # Representation: {'RSM': 0, 'ASIM': 4, 'ASAT': 5, ...
+  #logger.debug("Representation at end: {}".format(rep))
 
-  return representation
+  return rep
 
 
 def clean_up_mutants(generation, memberNum):
@@ -480,12 +1368,22 @@ def clean_up_mutants(generation, memberNum):
     config._NONFUNCTIONAL_MUTATIONS}
   """
 
-  cleanDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum))
+  # tmp/3/4/source/
+  sourceDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+              config._PROJECT_SRC_DIR.replace(config._PROJECT_DIR, ''))
+
+  forget_mutants(generation, memberNum)
 
-  for root, dirs, files in os.walk(cleanDir):
-    for aDir in dirs:
-      if aDir <> "project":
-        send2trash(os.path.join(root, aDir))
+  if os.path.isdir(sourceDir):
+    deleter.delete(sourceDir)
+
+  # The project is kept in its snapshot, the directory is only a check out
+  # of it (See checkout_local_project)
+  projectDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+                            'project')
+  if config._OBJECT_STORE and os.path.isdir(projectDir) and \
+    objectstore.load_snapshot(generation, memberNum) is not None:
+    deleter.delete(projectDir)
 
 
 def clean_up_remaining_mutants():
@@ -495,7 +1393,8 @@ def clean_up_remaining_mutants():
     for mem in xrange(1, config._EVOLUTION_POPULATION+1):
       sourceDir = os.path.join(config._TMP_DIR, str(gen), str(mem), "source")
       if os.path.isdir(sourceDir):
-        send2trash(sourceDir)
+        deleter.delete(sourceDir)
+      forget_mutants(gen, mem)
 
 # -----------------------------------------------------------------------------
 #
@@ -542,14 +1441,25 @@ def create_local_project(generation, memberNum, restart, switchGeneration=0):
   # tmp/3/3/project
   destDir = os.path.join(config._TMP_DIR, str(generation), staticPart)
 
+  if config._OBJECT_STORE:
+    if (generation is 1 or restart) and switchGeneration == 0:
+      tree = get_pristine_tree()
+    elif generation is 1 or restart:
+      tree = objectstore.load_snapshot(switchGeneration, memberNum)
+    else:
+      tree = objectstore.load_snapshot(generation - 1, memberNum)
+
+    objectstore.save_snapshot(generation, memberNum, tree)
+    return
+
   #logger.debug("---------------------------")
   #logger.debug("staticPart: {} {}".format(staticPart,  os.path.exists(destDir)))
   #logger.debug("srcDir:     {} {}".format(srcDir, os.path.exists(srcDir)))
   #logger.debug("destDir:    {} {}".format(destDir,  os.path.exists(destDir)))
 
   if os.path.exists(destDir):
-    shutil.rmtree(destDir)
-  shutil.copytree(srcDir, destDir, ignore=ignore_patterns('java.*'))
+    deleter.delete(destDir)
+  snapshot_project(srcDir, destDir, ignore=ignore_patterns('java.*'))
 
 
 def copy_local_project_a_to_b(generationSrc, memberNumSrc, generationDst, memberNumDst):
@@ -574,9 +1484,106 @@ def copy_local_project_a_to_b(generationSrc, memberNumSrc, generationDst, member
   #logger.debug("Copying a local project from A to B:")
   #logger.debug("\nSrc: {}\nDst: {}".format(srcDir, destDir))
 
+  if config._OBJECT_STORE:
+    objectstore.save_snapshot(generationDst, memberNumDst,
+                              objectstore.load_snapshot(generationSrc, memberNumSrc))
+    return
+
   if os.path.exists(destDir):
-    shutil.rmtree(destDir)
-  shutil.copytree(srcDir, destDir)
+    deleter.delete(destDir)
+  snapshot_project(srcDir, destDir)
+
+
+def get_pristine_tree():
+  """With config._OBJECT_STORE, the tree of the pristine project, which is
+  stored the first time it is needed. The files that create_local_project
+  leaves out (java.*) are left out of it.
+
+  Returns:
+  {string: string}: relative path => object name (See objectstore.py)
+  """
+
+  global _pristineTree
+
+  if _pristineTree is None:
+    _pristineTree = objectstore.add_directory(config._PROJECT_PRISTINE_DIR,
+                                              ignore=ignore_patterns('java.*'))
+
+  return _pristineTree
+
+
+def prune_objects():
+  """With config._OBJECT_STORE, remove the objects that neither a snapshot
+  nor the pristine project refers to (See objectstore.prune). Called between
+  generations, when no snapshot is being built."""
+
+  if config._OBJECT_STORE:
+    objectstore.prune([get_pristine_tree()])
+
+
+def checkout_local_project(generation, memberNum):
+  """With config._OBJECT_STORE, make sure the project directory of a member
+  (tmp/gen/member/project) is checked out from its snapshot. With
+  config._LINK_PROJECTS, it is made of hard links to the object store, so it
+  must not be written to.
+
+  Attributes:
+  generation (int): Generation of the member
+  memberNum (int): Which member of the population
+  """
+
+  if not config._OBJECT_STORE:
+    return
+
+  # tmp/3/4/project
+  projectDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+                            'project')
+  tree = objectstore.load_snapshot(generation, memberNum)
+
+  if tree is not None and not os.path.exists(projectDir):
+    objectstore.checkout(tree, projectDir, link=config._LINK_PROJECTS)
+
+
+def snapshot_project(srcDir, destDir, ignore=None):
+  """Without config._OBJECT_STORE, copy a project the way shutil.copytree
+  does, but with config._LINK_PROJECTS the files are hard linked to the ones
+  in srcDir. Only the directories are
+  created, so it takes the same time whatever the size of the files. A file
+  of the snapshot must be replaced, not written to, as that would change it
+  in srcDir too (See move_mutant_to_local_project).
+
+  Attributes:
+  srcDir (string): The project to copy
+  destDir (string): Where to put the snapshot, it must not exist
+  ignore (function): As for shutil.copytree
+  """
+
+  if not config._LINK_PROJECTS:
+    shutil.copytree(srcDir, destDir, ignore=ignore)
+    return
+
+  names = os.listdir(srcDir)
+  ignored = set()
+  if ignore is not None:
+    ignored = ignore(srcDir, names)
+
+  os.makedirs(destDir)
+
+  for name in names:
+    if name in ignored:
+      continue
+
+    srcName = os.path.join(srcDir, name)
+    destName = os.path.join(destDir, name)
+
+    if os.path.isdir(srcName):
+      snapshot_project(srcName, destName, ignore)
+    elif os.path.islink(srcName):
+      shutil.copy2(srcName, destName)
+    else:
+      hardlinks.link_or_copy(srcName, destName)
+
+  shutil.copystat(srcDir, destDir)
 
 
 def move_mutant_to_local_project(generation, memberNum, txlOperator, mutantNum):
@@ -639,14 +1646,28 @@ def move_mutant_to_local_project(generation, memberNum, txlOperator, mutantNum):
   #logger.debug("  relPart:       {}".format(relPart))
   #logger.debug("  cleanFileName: {}".format(cleanFileName))
 
-  if not os.path.exists(destPath):
+  if not os.path.exists(destPath) and not config._OBJECT_STORE:
     os.makedirs(destPath)
 
   #logger.debug("Moving mutant to local project:")
   #logger.debug("  sourceFile: {}".format(sourceFile))
   #logger.debug("  destFile:   {}".format(destFile))
 
-  shutil.copy(sourceFile, destFile)
+  # Store the mutant and point the snapshot of the project at it
+  if config._OBJECT_STORE:
+    tree = objectstore.load_snapshot(generation, memberNum)
+    tree[os.path.relpath(destFile, os.path.join(config._TMP_DIR, str(generation),
+         str(memberNum), 'project'))] = objectstore.add_data(read_mutant(sourceFile))
+    objectstore.save_snapshot(generation, memberNum, tree)
+    return
+
+  # The file may be hard linked to the project the local project was taken
+  # from (See snapshot_project), so replace it instead of writing to it
+  if os.path.exists(destFile):
+    os.remove(destFile)
+
+  with open(destFile, 'w') as f:
+    f.write(read_mutant(sourceFile))
 
 
 def move_local_project_to_workarea(generation, memberNum):
@@ -665,9 +1686,167 @@ def move_local_project_to_workarea(generation, memberNum):
   #logger.debug("Moving local project to work area:")
   #logger.debug("\nSrc: {}\nDst: {}".format(srcDir, config._PROJECT_DIR))
 
-  if os.path.exists(config._PROJECT_DIR):
-    shutil.rmtree(config._PROJECT_DIR)
-  shutil.copytree(srcDir, config._PROJECT_DIR)
+  global _workareaFiles
+
+  # The snapshot of the project (See config._OBJECT_STORE)
+  tree = None
+  if config._OBJECT_STORE:
+    tree = objectstore.load_snapshot(generation, memberNum)
+
+  if config._SYNC_WORKAREA and _workareaFiles is not None and \
+    os.path.exists(config._PROJECT_DIR):
+    sync_workarea(srcDir, tree)
+    return
+
+  if tree is not None:
+    objectstore.checkout(tree, config._PROJECT_DIR, link=False)
+  else:
+    if os.path.exists(config._PROJECT_DIR):
+      shutil.rmtree(config._PROJECT_DIR)
+    shutil.copytree(srcDir, config._PROJECT_DIR)
+
+  if config._SYNC_WORKAREA:
+    commit_workarea()
+    _workareaFiles = {}
+    if tree is not None:
+      for relFile, name in tree.iteritems():
+        _workareaFiles[relFile] = (None, None, name)
+      return
+
+    for root, dirs, files in os.walk(srcDir):
+      for aFile in files:
+        srcFile = os.path.join(root, aFile)
+        stat = os.stat(srcFile)
+        _workareaFiles[os.path.relpath(srcFile, srcDir)] = (stat.st_size,
+                                                            stat.st_mtime, None)
+
+
+def sync_workarea(srcDir, tree=None):
+  """Bring the work area up to date with a local project by copying only the
+  files that differ from the ones copied by the last sync, and removing the
+  ones the project doesn't have. A file is unchanged if its size and mtime
+  are the same, or failing that, its hash. Files the project never had, like
+  the compiled classes and ConTest's files, are left alone. The changes are
+  journaled so rollback_workarea can undo them.
+
+  Attributes:
+  srcDir (string): The local project, eg: tmp/3/4/project
+  tree ({string: string}): With config._OBJECT_STORE, the snapshot of the
+    project. The files are compared by object name and srcDir isn't read.
+  """
+
+  commit_workarea()
+
+  if tree is not None:
+    for relFile, name in tree.iteritems():
+      destFile = os.path.join(config._PROJECT_DIR, relFile)
+      entry = _workareaFiles.get(relFile)
+      if entry is not None and entry[2] == name and os.path.exists(destFile):
+        continue
+
+      journal_workarea_file(relFile)
+      if not os.path.exists(os.path.dirname(destFile)):
+        os.makedirs(os.path.dirname(destFile))
+      shutil.copy2(objectstore.get_object_file(name), destFile)
+      _workareaFiles[relFile] = (None, None, name)
+
+    for relFile in [f for f in _workareaFiles if f not in tree]:
+      journal_workarea_file(relFile)
+      del _workareaFiles[relFile]
+
+    return
+
+  projectFiles = set()
+
+  for root, dirs, files in os.walk(srcDir):
+    for aFile in files:
+      srcFile = os.path.join(root, aFile)
+      relFile = os.path.relpath(srcFile, srcDir)
+      destFile = os.path.join(config._PROJECT_DIR, relFile)
+      projectFiles.add(relFile)
+
+      stat = os.stat(srcFile)
+      entry = _workareaFiles.get(relFile)
+
+      if entry is not None and os.path.exists(destFile):
+        size, mtime, fileHash = entry
+        if size == stat.st_size and mtime == stat.st_mtime:
+          continue
+
+        if size == stat.st_size:
+          if fileHash is None:
+            fileHash = hashlist.hash_file(destFile)
+          if fileHash == hashlist.hash_file(srcFile):
+            _workareaFiles[relFile] = (stat.st_size, stat.st_mtime, fileHash)
+            continue
+
+      journal_workarea_file(relFile)
+      if not os.path.exists(os.path.dirname(destFile)):
+        os.makedirs(os.path.dirname(destFile))
+      shutil.copy2(srcFile, destFile)
+      _workareaFiles[relFile] = (stat.st_size, stat.st_mtime, None)
+
+  for relFile in [f for f in _workareaFiles if f not in projectFiles]:
+    journal_workarea_file(relFile)
+    del _workareaFiles[relFile]
+
+
+def get_workarea_journal_dir():
+  """ The directory holding the work area files replaced by the last sync """
+
+  return os.path.join(config._TMP_DIR, 'workarea-journal')
+
+
+def journal_workarea_file(relFile):
+  """Move a work area file out of the way before sync_workarea replaces or
+  removes it, and journal the change.
+
+  Attributes:
+  relFile (string): Path of the file, relative to the work area
+  """
+
+  destFile = os.path.join(config._PROJECT_DIR, relFile)
+  backupFile = None
+
+  if os.path.exists(destFile):
+    backupFile = os.path.join(get_workarea_journal_dir(), str(len(_workareaJournal)))
+    if not os.path.exists(get_workarea_journal_dir()):
+      os.makedirs(get_workarea_journal_dir())
+    shutil.move(destFile, backupFile)
+
+  _workareaJournal.append((relFile, backupFile, _workareaFiles.get(relFile)))
+
+
+def commit_workarea():
+  """Forget the changes of the last sync, so they can no longer be undone."""
+
+  del _workareaJournal[:]
+  if os.path.exists(get_workarea_journal_dir()):
+    shutil.rmtree(get_workarea_journal_dir())
+
+
+def rollback_workarea():
+  """Undo the last sync of the work area (See sync_workarea), eg: after the
+  project failed to compile. The compiled classes aren't restored."""
+
+  if _workareaFiles is None:
+    return
+
+  while _workareaJournal:
+    relFile, backupFile, entry = _workareaJournal.pop()
+    destFile = os.path.join(config._PROJECT_DIR, relFile)
+
+    if os.path.exists(destFile):
+      os.remove(destFile)
+    if backupFile is not None:
+      shutil.move(backupFile, destFile)
+
+    if entry is None:
+      _workareaFiles.pop(relFile, None)
+    else:
+      _workareaFiles[relFile] = entry
+
+  commit_workarea()
 
 
 def compile_project():
@@ -682,9 +1861,8 @@ def compile_project():
   outFile = tempfile.SpooledTemporaryFile()
   errFile = tempfile.SpooledTemporaryFile()
 
-  if os.path.exists(config._PROJECT_CLASS_DIR):
-    shutil.rmtree(config._PROJECT_CLASS_DIR)
-  os.mkdir(config._PROJECT_CLASS_DIR)
+  # In memory if there is scratch space (See scratch.py)
+  scratch.place_dir(config._PROJECT_CLASS_DIR, 'class')
 
   # Make an ant call to compile the program
   antProcess = subprocess.Popen(['ant', config._PROJECT_COMPILE], stdout=outFile,
@@ -726,6 +1904,11 @@ def move_best_project_to_output(generation, memberNum):
   logger.debug("Moving local project to output:")
   logger.debug("\nSrc: {}\nDst: {}".format(srcDir, config._PROJECT_OUTPUT_DIR))
 
+  if config._OBJECT_STORE:
+    objectstore.checkout(objectstore.load_snapshot(generation, memberNum),
+                         config._PROJECT_OUTPUT_DIR, link=False)
+    return
+
   if os.path.exists(config._PROJECT_OUTPUT_DIR):
     shutil.rmtree(config._PROJECT_OUTPUT_DIR)
   shutil.copytree(srcDir, config._PROJECT_OUTPUT_DIR)
@@ -737,6 +1920,14 @@ def move_best_project_to_output(generation, memberNum):
 # -----------------------------------------------------------------------------
 
 def was_run_synchronized(srcDir):
+  """Does any Java file of a project synchronize a run() method?
+
+  Attributes:
+  srcDir (string): Source directory of the project
+
+  Returns:
+  boolean: True if run() is synchronized
+  """
 
   for root, dirs, files in os.walk(srcDir):
 
@@ -747,92 +1938,38 @@ def was_run_synchronized(srcDir):
         #logger.debug("Checking if run was synched in:")
         #logger.debug("\n{}".format(sourceFile))
 
-        return check_synch_run_work(sourceFile)
+        with open(sourceFile) as f:
+          if mutantfilter.synchronized_run(mutantfilter.tokenize_java(f.read())):
+            return True
 
   return False
 
 
-def check_synch_run(generation, memberNum, txlOperator, mutantNum):
-
-  javaFile = uniqueMutants[(generation, memberNum, txlOperator, mutantNum)]
-
-  return check_synch_run_work(javaFile)
-
-# Important note: The src/_evolution/test_exclusion subdirectory contains
-#                 a test program for the regular expressions below. See
-#                 exclusion-tester.py for details.
-
-def check_synch_run_work(javaFile):
-  with open(javaFile) as f:
-    lines = f.read().splitlines()
-
-  inRun = False
-  for line in lines:
-    # Strip out comments
-    if line.find("//") > 0:
-      line = line[:line.find("//")]
+def is_disallowed_mutant(generation, memberNum, txlOperator, mutantNum):
+  """Does a selected mutant break an exclusion rule (See mutantfilter.py)?
+  Only mutants that weren't generated when the representation was built
+  need checking, the others were left out of it.
 
-    # look for "synchronized void run()"
-    if re.search("synchronized (.*) run[\ (]", line):
-      #logger.debug("Disallowed mutant detected (case 1):")
-      #logger.debug("\n{}".format(line))
-      return True
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are mutating
+  txlOperator (string): Name of the operator, eg: ASAT
+  mutantNum (int): Number of the mutant, as in uniqueMutants
 
-    # This is a crude way to look for
-    # public void run(){
-    #   ...
-    #   synchronized
-    #   ...
-    #   }
-    # The only condition is that synchronized appears before ANY closing
-    # bracket, "}""
+  Returns:
+  boolean: True if the mutant isn't allowed
+  """
 
-    if re.search("[\ ]run[\ (]", line):
-      inRun = True
+  javaFile = uniqueMutants[(generation, memberNum, txlOperator, mutantNum)]
 
-    if re.search("synchronized", line) and inRun:
-      #logger.debug("Disallowed mutant detected (case 2):")
-      #logger.debug("\n{}".format(line))
-      return True
+  if javaFile not in _uncheckedMutants:
+    return False
+  _uncheckedMutants.discard(javaFile)
 
-    if re.search("[\}+]", line) and inRun:
-      inRun = False
+  brokenRule = mutantfilter.find_broken_rule(mutantfilter.tokenize_java(
+               read_mutant(javaFile)))
+  if brokenRule is not None:
+    logger.debug("Disallowed mutant {} ({})".format(javaFile, brokenRule))
+    return True
 
   return False
-
-
-# Important note: The src/_evolution/test_remove_multi_synch subdirectory
-#                 contains a test program for the regular expressions below.
-#                 See remove-multi-synch.py for details.
-
-def check_double_synch(generation, memberNum, txlOperator, mutantNum):
-  synchStack = list()
-  doubleSynchFound = False
-
-  javaFile = uniqueMutants[(generation, memberNum, txlOperator, mutantNum)]
-  #logger.debug("Java file: {}".format(javaFile))
-
-  with open(javaFile) as f:
-    lines = f.read().splitlines()
-
-  for line in lines:
-    # Strip out comments
-    if line.find("//") > 0:
-      line = line[:line.find("//")]
-
-    # Look for a synchronization variable. If found, add it to the stack
-    synchVar = re.search("synchronized \((\S+)\)", line)
-    if synchVar is not None:
-      #logger.debug("Synch var {}".format(synchVar.group(1)))
-      if synchVar.group(1) in synchStack:
-        doubleSynchFound = True
-        #logger.debug("Double synchronization found in file {} on variable {}"\
-        #  .format(javaFile, synchVar.group(1)))
-      else:
-        synchStack.append(synchVar.group(1))
-
-      # When we find a closing curly brace, we pop the stack
-      if line.find("}") > 0 and len(synchStack) > 0:
-        synchStack.pop()
-
-  return doubleSynchFound
\ No newline at end of file
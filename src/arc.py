@@ -41,13 +41,13 @@ if os.path.exists(srcConfig):
 
 import config
 from _contest import contester
+from _contest import tester
 from _evolution import evolution
 from _txl import txl_operator
 from _evolution import static
+from _txl import deleter
+from _txl import scratch
 import fileinput
-# Send2Trash from https://pypi.python.org/pypi/Send2Trash
-# Details on its use is in step 9 below
-from send2trash import send2trash
 
 import logging
 logger = logging.getLogger('output-log')
@@ -129,6 +129,9 @@ def main():
 
   txl_operator.compile_project()
 
+  # The test runner of the screening runs (See _contest/tester.py)
+  tester.compile_screening_runner()
+
   # 5. Set up ConTest (Thread noising tool)
   contester.setup()
   # 6. Set up Chord (A static analysis tool)
@@ -177,6 +180,9 @@ def main():
       outText).groups()[0]
 
   # 8. Acquire dynamic timeout value from ConTest
+  # When config._CONTEST_ADAPTIVE_TIMEOUT is enabled, this is only the upper
+  # bound. The timeout of each run follows the execution times of the
+  # successful runs, starting with these ones. (See _contest/runtimes.py)
   contestTime = contester.run_test_execution(20)
   # Too many runs is overkill
   #contestTime = contester.run_test_execution(config._CONTEST_RUNS *
@@ -187,20 +193,19 @@ def main():
   # 9. Clean up the temporary directory (Probably has subdirs from previous runs)
   logger.info("Cleaning TMP directory")
   # Cleaning up a previous run could take half an hour on the mac
-  # (10,000+ files is slow)
-  # Trying an alternate approach: Sending the files to the trash
-  # Using an external module, Send2Trash from:
-  # https://pypi.python.org/pypi/Send2Trash
-  # Install command: pip install Send2Trash
-  # Some info on pip at: https://pypi.python.org/pypi
+  # (10,000+ files is slow), so it is moved out of the way and deleted in
+  # the background (See _txl/deleter.py)
 
   if not os.path.exists(config._TMP_DIR):
     os.makedirs(config._TMP_DIR)
   else:
-    send2trash(config._TMP_DIR)
+    deleter.delete(config._TMP_DIR)
     #shutil.rmtree(config._TMP_DIR) Native python, slow
     os.makedirs(config._TMP_DIR)
 
+  # Keep the busiest parts of it in memory (See _txl/scratch.py)
+  scratch.setup()
+
   # We're keeping a database (config file) containing the results
   # of previous static analysis runs. Check it first.
   if not static.find_static_in_db(config._PROJECT_TESTSUITE):
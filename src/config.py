@@ -8,10 +8,14 @@ import logging
 
 # System variables
 _ROOT_DIR = "/Users/kelk/workspace/arc/"
-_MAX_MEMORY_MB = 2000
+_MAX_MEMORY_MB = 2000  # Budget of _SCRATCH_DIR
 _MAX_CORES = 2
 _TMP_DIR = _ROOT_DIR + "tmp/"
 _TXL_DIR = _ROOT_DIR + "src/_txl/"
+_CACHE_DIR = _ROOT_DIR + "cache/"  # Kept from one run of ARC to the next
+_GRAVEYARD_DIR = _ROOT_DIR + "graveyard/"  # Deleted files, see _txl/deleter.py
+_DELETE_MIN_FREE_MB = 1000  # Wait for deleted files to be removed below this
+_SCRATCH_DIR = None  # In memory tmp space (eg: "/dev/shm/arc/"), see _txl/scratch.py
 _JUNIT_JAR = _ROOT_DIR + "lib/junit-4.8.1.jar"
 _LOG_LEVEL = "DEBUG"  # {OFF,ERROR,WARN,INFO,DEBUG}
 _LOG_FILE = "log.txt"  # If None then use stdout, otherwise specify a file
@@ -59,6 +63,104 @@ _CONTEST_RUNS = 15
 _CONTEST_TIMEOUT_SEC = 300 # Default timeout, it is adjusted dynamically
 _CONTEST_TIMEOUT_MULTIPLIER = 15  # The average execution time (with conTest) is multiplied by this
 _CONTEST_VALIDATION_MULTIPLIER = 10  # Allows for validation of functionality
+_CONTEST_CALIBRATION_MAX_ENTRIES = 50  # Cached timeout calibrations kept (Least recently used are dropped)
+
+# Derive the timeout of each run from the execution times of the runs made
+# with as many runs at once: the _CONTEST_TIMEOUT_QUANTILE of the times *
+# _CONTEST_TIMEOUT_SAFETY_FACTOR, but never more than _CONTEST_TIMEOUT_SEC.
+# A run that times out counts as taking its timeout.
+_CONTEST_ADAPTIVE_TIMEOUT = True
+_CONTEST_TIMEOUT_QUANTILE = 0.99
+_CONTEST_TIMEOUT_SAFETY_FACTOR = 3
+_CONTEST_TIMEOUT_MIN_SAMPLES = 20  # Runs needed before adapting
+_CONTEST_TIMEOUT_MIN_SEC = 5
+
+# Send a SIGQUIT every _CONTEST_DEADLOCK_PROBE_SEC to a run that is taking
+# longer than expected, ending it as soon as the JVM reports a deadlock
+_CONTEST_DEADLOCK_PROBE = False
+_CONTEST_DEADLOCK_PROBE_SEC = 2
+
+_CONTEST_PARALLEL = True  # Run up to _MAX_CORES functional test executions at once
+_CONTEST_RUN_DIR = _TMP_DIR + "contest/"  # Isolated ConTest state of parallel runs
+
+# Stop a functional evaluation once a sequential probability ratio test shows
+# the mutant is buggy. Results are scaled up to _CONTEST_RUNS.
+_CONTEST_EARLY_STOP = True
+_CONTEST_EARLY_STOP_MIN_RUNS = 3
+_SPRT_BUGGY_RATE = 0.5  # Success rate of a buggy program
+_SPRT_FIXED_RATE = 0.95  # Success rate of a fixed program
+_SPRT_ALPHA = 0.01  # Chance of stopping the evaluation of a fixed program
+_SPRT_BETA = 0.05  # Chance of not stopping the evaluation of a buggy program
+
+# Non-functional measurements stop once the 95% confidence intervals of the
+# mean time and context switches are narrower than _NONFUNCTIONAL_CI_WIDTH
+# (relative to the mean). At least _NONFUNCTIONAL_MIN_RUNS and at most
+# _CONTEST_RUNS * _CONTEST_VALIDATION_MULTIPLIER runs are made.
+_NONFUNCTIONAL_ADAPTIVE_RUNS = True
+_NONFUNCTIONAL_CI_WIDTH = 0.1
+_NONFUNCTIONAL_MIN_RUNS = 10
+
+# The functional evaluation of mutants runs the _CONTEST_SCREENING_TESTS test
+# methods that failed most often first, and stops at the first failing test.
+# Validation still runs the whole testsuite. Off until ArcTestRunner has been
+# run against the bundled JUnit jar (See tester.check_screening_runner)
+_CONTEST_SCREENING = False
+_CONTEST_SCREENING_TESTS = 5
+_CONTEST_RUNNER_SRC = _ROOT_DIR + "src/_contest/ArcTestRunner.java"  # Compiled with the project
+
+# Keep the outcomes of testing compiled projects in _CACHE_DIR, so identical
+# projects are only tested once (Least recently used outcomes are evicted)
+_TEST_CACHE = True
+_TEST_CACHE_MAX_ENTRIES = 10000
+
+# Compile each TXL program once, instead of on every invocation of txl. The
+# compiled programs are kept in _TXL_COMPILED_DIR, by the hash of the program
+# and the files it includes. Off until tests/test_txl_modes.py has passed
+# with the installed txl
+_TXL_PRECOMPILE = False
+_TXL_COMPILED_DIR = _TXL_DIR + "compiled/"
+
+# Generate the mutants of every target of a targeted operator (eg: ASAT with
+# class, method, variable information) with one txl invocation per file. Off
+# until tests/test_txl_modes.py has passed with the installed txl
+_TXL_BATCH_TARGETS = False
+
+# Reuse the mutants of source files that haven't changed since they were last
+# mutated (eg: in the previous generation), instead of running TXL on them
+_INCREMENTAL_MUTANTS = True
+
+# Keep the reused mutants in _CACHE_DIR instead of _TMP_DIR, so they are also
+# reused by later runs of ARC on an identical file (Least recently used
+# mutants are evicted)
+_MUTANT_CACHE = True
+_MUTANT_CACHE_MAX_MB = 1000
+
+# Only list the mutants of a project when it is mutated, and generate the ones
+# that are selected when they are needed. The mutants that aren't generated yet
+# are only checked against the exclusion rules once they are selected, and
+# aren't deduplicated (See _txl/mutantfilter.py)
+_LAZY_MUTANTS = False
+
+# Keep the mutants of a member in one pack file (tmp/gen/member/mutants.pack)
+# instead of one file per mutant
+_PACK_MUTANTS = True
+
+# Give mutants of a file that only differ in whitespace and comments a single
+# place in the genome
+_DEDUP_MUTANTS = True
+
+# Build the local projects of the members (tmp/gen/member/project) out of hard
+# links to the project they are taken from (or with _OBJECT_STORE, to the
+# objects), rather than copies
+_LINK_PROJECTS = True
+
+# Keep the local projects of the members as snapshots in a content-addressed
+# store (tmp/objects), so each version of a file is only stored once
+_OBJECT_STORE = False
+
+# Only copy the files that changed when a local project is moved to the work
+# area, instead of replacing the whole work area
+_SYNC_WORKAREA = True
 
 # Mutation operator variables
 # [0]Name  [1]Enable  [2]Enable for DataRace  [3]Enable for Deadlock  [4]File
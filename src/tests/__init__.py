@@ -0,0 +1,6 @@
+"""Unit tests of the parts of ARC that don't need TXL, ConTest or a JVM.
+
+Run them from the src directory:
+
+  python -m unittest discover -s tests -t .
+"""
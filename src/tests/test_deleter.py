@@ -0,0 +1,81 @@
+"""Tests of deleting through the graveyard while the purger empties it."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import config
+from _txl import deleter
+
+
+class DeleterTest(unittest.TestCase):
+
+  def setUp(self):
+    self.saved = dict((name, getattr(config, name)) for name in
+                      ['_GRAVEYARD_DIR', '_DELETE_MIN_FREE_MB'])
+    self.savedGraveyards = deleter._graveyards[:]
+    self.tmpDir = tempfile.mkdtemp()
+    config._GRAVEYARD_DIR = os.path.join(self.tmpDir, 'graveyard')
+    config._DELETE_MIN_FREE_MB = 0
+    del deleter._graveyards[:]
+
+  def tearDown(self):
+    self.assertTrue(deleter.wait_for_purge(30))
+    for name, value in self.saved.iteritems():
+      setattr(config, name, value)
+    deleter._graveyards[:] = self.savedGraveyards
+    shutil.rmtree(self.tmpDir)
+
+  def make_tree(self, name, files=20):
+    path = os.path.join(self.tmpDir, name)
+    os.makedirs(os.path.join(path, 'source'))
+    for i in xrange(files):
+      with open(os.path.join(path, 'source', 'Mutant_{}.java'.format(i)), 'w') as f:
+        f.write('class Mutant {}')
+    return path
+
+  def test_directory_is_gone_right_away(self):
+    path = self.make_tree('1')
+    deleter.delete(path)
+    self.assertFalse(os.path.exists(path))
+    self.assertTrue(deleter.wait_for_purge(30))
+    self.assertEqual(os.listdir(config._GRAVEYARD_DIR), [])
+
+  def test_file_and_symbolic_link(self):
+    path = self.make_tree('target')
+    link = os.path.join(self.tmpDir, 'link')
+    os.symlink(path, link)
+    aFile = os.path.join(path, 'source', 'Mutant_0.java')
+
+    deleter.delete(link)
+    deleter.delete(aFile)
+    self.assertFalse(os.path.lexists(link))
+    self.assertFalse(os.path.exists(aFile))
+    # What the link pointed to is left alone
+    self.assertTrue(os.path.exists(os.path.join(path, 'source', 'Mutant_1.java')))
+
+  def test_same_names_while_purging(self):
+    # The purger empties the graveyard while more is moved into it, and the
+    # graves of directories with the same name don't collide
+    for _ in xrange(50):
+      deleter.delete(self.make_tree('tmp', 5))
+    self.assertFalse(os.path.exists(os.path.join(self.tmpDir, 'tmp')))
+    self.assertTrue(deleter.wait_for_purge(30))
+    self.assertEqual(os.listdir(config._GRAVEYARD_DIR), [])
+
+  def test_wait_times_out(self):
+    deleter.start_purger()
+    self.assertTrue(deleter.wait_for_purge(30))
+
+    # The purger is idle, nothing will empty the graveyard
+    deleter._empty.clear()
+    self.assertFalse(deleter.wait_for_purge(0.2))
+    deleter._empty.set()
+
+  def test_missing_path(self):
+    deleter.delete(os.path.join(self.tmpDir, 'missing'))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,119 @@
+"""Tests of the rules that keep mutants out of the genome, and of the
+fingerprints that find duplicate mutants."""
+
+import unittest
+
+import config
+from _txl import mutantfilter
+
+
+def broken_rule(source):
+  return mutantfilter.find_broken_rule(mutantfilter.tokenize_java(source))
+
+
+class TokenizeTest(unittest.TestCase):
+
+  def test_comments_and_whitespace_are_dropped(self):
+    self.assertEqual(mutantfilter.tokenize_java(
+                     "synchronized(lock) { // synchronized (lock)\n"
+                     "  /* run() */ x++; }"),
+                     ['synchronized', '(', 'lock', ')', '{', 'x', '+', '+', ';',
+                      '}'])
+
+  def test_literals_are_single_tokens(self):
+    self.assertEqual(mutantfilter.tokenize_java(
+                     'log("synchronized (lock) { // ", \'}\');'),
+                     ['log', '(', '"synchronized (lock) { // "', ',', "'}'",
+                      ')', ';'])
+
+
+class RulesTest(unittest.TestCase):
+
+  def setUp(self):
+    # config.py doesn't have it unless the user adds it
+    self.saved = getattr(config, '_EXCLUDE_RUN', None)
+    config._EXCLUDE_RUN = True
+
+  def tearDown(self):
+    if self.saved is None:
+      del config._EXCLUDE_RUN
+    else:
+      config._EXCLUDE_RUN = self.saved
+
+  def test_allowed(self):
+    self.assertIsNone(broken_rule("""
+      class Account {
+        void deposit() { synchronized (lock) { balance++; } }
+        void withdraw() { synchronized (lock) { balance--; } }
+        public void run() { deposit(); }
+      }"""))
+
+  def test_double_synchronization(self):
+    self.assertEqual(broken_rule("""
+      class Account {
+        void deposit() {
+          synchronized (this.lock) { if (x) { synchronized (this.lock) { } } }
+        }
+      }"""), 'double synchronization')
+
+  def test_nested_different_locks(self):
+    self.assertIsNone(broken_rule("""
+      class Account {
+        void deposit() { synchronized (a) { synchronized (b) { } } }
+        void withdraw() { synchronized (b) { } synchronized (a) { } }
+      }"""))
+
+  def test_synchronized_run(self):
+    self.assertEqual(broken_rule("""
+      class Worker implements Runnable {
+        public synchronized void run() { work(); }
+      }"""), 'synchronized run()')
+    self.assertEqual(broken_rule("""
+      class Worker extends Thread {
+        public void run() throws Exception {
+          synchronized (lock) { work(); }
+        }
+      }"""), 'synchronized run()')
+
+  def test_calls_to_run_are_allowed(self):
+    self.assertIsNone(broken_rule("""
+      class Worker {
+        synchronized void start() { thread.run(); }
+        Object make() { return run(); }
+        abstract void run();
+      }"""))
+
+  def test_run_rule_can_be_turned_off(self):
+    config._EXCLUDE_RUN = False
+    self.assertIsNone(broken_rule("""
+      class Worker { public synchronized void run() { } }"""))
+
+
+class FingerprintTest(unittest.TestCase):
+
+  def fingerprint(self, sourceFile, source):
+    return mutantfilter.fingerprint(sourceFile,
+                                    mutantfilter.tokenize_java(source))
+
+  def test_whitespace_and_comments_dont_matter(self):
+    self.assertEqual(
+      self.fingerprint('Account.java', 'synchronized (lock) { x++; }'),
+      self.fingerprint('Account.java', 'synchronized(lock){\n  // ASAT\n  x++;\n}'))
+
+  def test_code_matters(self):
+    self.assertNotEqual(
+      self.fingerprint('Account.java', 'synchronized (lock) { x++; }'),
+      self.fingerprint('Account.java', 'synchronized (this) { x++; }'))
+    # Tokens can't run into each other
+    self.assertNotEqual(self.fingerprint('Account.java', 'int ab;'),
+                        self.fingerprint('Account.java', 'int a b;'))
+    self.assertNotEqual(self.fingerprint('Account.java', 'log("a b");'),
+                        self.fingerprint('Account.java', 'log("a  b");'))
+
+  def test_source_file_matters(self):
+    self.assertNotEqual(self.fingerprint('Account.java', 'class A {}'),
+                        self.fingerprint('Bank.java', 'class A {}'))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,116 @@
+"""Tests of storing, checking out and pruning project snapshots."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import config
+from _txl import deleter
+from _txl import objectstore
+
+
+class ObjectStoreTest(unittest.TestCase):
+
+  def setUp(self):
+    self.saved = dict((name, getattr(config, name)) for name in
+                      ['_TMP_DIR', '_GRAVEYARD_DIR', '_DELETE_MIN_FREE_MB'])
+    self.tmpDir = tempfile.mkdtemp()
+    config._TMP_DIR = os.path.join(self.tmpDir, 'tmp')
+    config._GRAVEYARD_DIR = os.path.join(self.tmpDir, 'graveyard')
+    config._DELETE_MIN_FREE_MB = 0
+
+    self.projectDir = os.path.join(self.tmpDir, 'input')
+    self.write('source/Account.java', 'class Account {}')
+    self.write('source/Bank.java', 'class Bank {}')
+    self.write('test/AccountTest.java', 'class AccountTest {}')
+    self.write('build.xml', '<project/>')
+
+  def tearDown(self):
+    deleter.wait_for_purge(30)
+    for name, value in self.saved.iteritems():
+      setattr(config, name, value)
+    shutil.rmtree(self.tmpDir)
+
+  def write(self, relFile, text):
+    path = os.path.join(self.projectDir, relFile)
+    if not os.path.exists(os.path.dirname(path)):
+      os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+      f.write(text)
+
+  def count_objects(self):
+    storeDir = objectstore.get_store_dir()
+    return sum(len(os.listdir(os.path.join(storeDir, prefix)))
+               for prefix in os.listdir(storeDir))
+
+  def test_each_version_is_stored_once(self):
+    first = objectstore.add_data('class Account {}')
+    self.assertEqual(first, objectstore.add_data('class Account {}'))
+    self.assertNotEqual(first, objectstore.add_data('class Account {}',
+                                                    executable=True))
+    self.assertEqual(self.count_objects(), 2)
+
+  def test_add_directory_and_checkout(self):
+    tree = objectstore.add_directory(self.projectDir,
+                                     shutil.ignore_patterns('build.xml'))
+    self.assertEqual(sorted(tree), ['source/Account.java', 'source/Bank.java',
+                                    'test/AccountTest.java'])
+
+    destDir = os.path.join(self.tmpDir, 'checkout')
+    objectstore.checkout(tree, destDir)
+    with open(os.path.join(destDir, 'source/Bank.java')) as f:
+      self.assertEqual(f.read(), 'class Bank {}')
+
+    # Hard linked to the objects, unless asked for copies
+    objectFile = objectstore.get_object_file(tree['source/Bank.java'])
+    self.assertTrue(os.path.samefile(os.path.join(destDir, 'source/Bank.java'),
+                                     objectFile))
+    objectstore.checkout(tree, destDir, link=False)
+    self.assertFalse(os.path.samefile(os.path.join(destDir, 'source/Bank.java'),
+                                      objectFile))
+    self.assertFalse(os.path.exists(os.path.join(destDir, 'build.xml')))
+
+  def test_hash_tree(self):
+    tree = objectstore.add_directory(self.projectDir)
+    sourceHash = objectstore.hash_tree(tree, 'source/')
+
+    self.write('test/AccountTest.java', 'class AccountTest { int x; }')
+    changed = objectstore.add_directory(self.projectDir)
+    self.assertEqual(sourceHash, objectstore.hash_tree(changed, 'source/'))
+    self.assertNotEqual(objectstore.hash_tree(tree), objectstore.hash_tree(changed))
+
+  def test_snapshot_replaces_project(self):
+    tree = objectstore.add_directory(self.projectDir)
+    projectDir = os.path.join(config._TMP_DIR, '2', '3', 'project')
+    objectstore.checkout(tree, projectDir)
+
+    self.assertIsNone(objectstore.load_snapshot(2, 3))
+    objectstore.save_snapshot(2, 3, tree)
+    self.assertEqual(objectstore.load_snapshot(2, 3), tree)
+    self.assertFalse(os.path.exists(projectDir))
+
+  def test_prune_keeps_reachable_objects(self):
+    pristine = objectstore.add_directory(self.projectDir)
+
+    self.write('source/Account.java', 'class Account { int balance; }')
+    member = objectstore.add_directory(self.projectDir)
+    objectstore.save_snapshot(1, 1, member)
+
+    self.write('source/Account.java', "class Account { doesn't compile")
+    objectstore.add_directory(self.projectDir)
+    self.assertEqual(self.count_objects(), 6)
+
+    objectstore.prune([pristine])
+    self.assertEqual(self.count_objects(), 5)
+    for name in pristine.values() + member.values():
+      self.assertTrue(os.path.exists(objectstore.get_object_file(name)))
+
+    # Once the member's snapshot is gone, so are its own objects
+    os.remove(objectstore.get_snapshot_file(1, 1))
+    objectstore.prune([pristine])
+    self.assertEqual(self.count_objects(), 4)
+
+
+if __name__ == '__main__':
+  unittest.main()
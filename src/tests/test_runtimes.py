@@ -0,0 +1,105 @@
+"""Tests of the run time estimates behind the adaptive timeouts."""
+
+import random
+import unittest
+
+import config
+from _contest import runtimes
+
+
+class QuantileEstimatorTest(unittest.TestCase):
+
+  def test_no_values(self):
+    self.assertIsNone(runtimes.QuantileEstimator(0.99).value())
+
+  def test_few_values_are_exact(self):
+    estimate = runtimes.QuantileEstimator(0.5)
+    for value in [5, 1, 3]:
+      estimate.add(value)
+    self.assertEqual(estimate.value(), 3)
+
+  def test_streaming_quantile(self):
+    rand = random.Random(42)
+    values = [rand.uniform(0, 100) for _ in xrange(20000)]
+
+    estimate = runtimes.QuantileEstimator(0.99)
+    for value in values:
+      estimate.add(value)
+
+    exact = sorted(values)[int(0.99 * len(values))]
+    self.assertAlmostEqual(estimate.value(), exact, delta=1.0)
+
+  def test_extremes_are_kept(self):
+    estimate = runtimes.QuantileEstimator(0.9)
+    for value in xrange(1, 101):
+      estimate.add(value)
+    self.assertEqual(estimate.heights[0], 1)
+    self.assertEqual(estimate.heights[4], 100)
+
+
+class TimeoutTest(unittest.TestCase):
+
+  def setUp(self):
+    self.saved = dict((name, getattr(config, name)) for name in
+                      ['_CONTEST_ADAPTIVE_TIMEOUT', '_CONTEST_TIMEOUT_SEC',
+                       '_CONTEST_TIMEOUT_MIN_SEC', '_CONTEST_TIMEOUT_MIN_SAMPLES',
+                       '_CONTEST_TIMEOUT_SAFETY_FACTOR',
+                       '_CONTEST_TIMEOUT_QUANTILE'])
+    config._CONTEST_ADAPTIVE_TIMEOUT = True
+    config._CONTEST_TIMEOUT_SEC = 150
+    config._CONTEST_TIMEOUT_MIN_SEC = 5
+    config._CONTEST_TIMEOUT_MIN_SAMPLES = 20
+    config._CONTEST_TIMEOUT_SAFETY_FACTOR = 3
+    config._CONTEST_TIMEOUT_QUANTILE = 0.99
+    runtimes._runTimes.clear()
+    runtimes._seedTimes.clear()
+
+  def tearDown(self):
+    for name, value in self.saved.iteritems():
+      setattr(config, name, value)
+    runtimes._runTimes.clear()
+    runtimes._seedTimes.clear()
+
+  def test_fixed_timeout_until_enough_samples(self):
+    for _ in xrange(19):
+      runtimes.add_run_time(True, 10)
+    self.assertEqual(runtimes.get_timeout(True), 150)
+
+  def test_adaptive_timeout(self):
+    for _ in xrange(20):
+      runtimes.add_run_time(True, 10)
+    self.assertAlmostEqual(runtimes.get_timeout(True), 30)
+
+  def test_timeout_is_bounded(self):
+    for _ in xrange(20):
+      runtimes.add_run_time(True, 1)
+      runtimes.add_run_time(False, 100)
+    self.assertEqual(runtimes.get_timeout(True), 5)
+    self.assertEqual(runtimes.get_timeout(False), 150)
+
+  def test_turned_off(self):
+    config._CONTEST_ADAPTIVE_TIMEOUT = False
+    for _ in xrange(20):
+      runtimes.add_run_time(True, 10)
+    self.assertEqual(runtimes.get_timeout(True), 150)
+
+  def test_seed_applies_to_every_concurrency(self):
+    runtimes.add_run_time(True, 99, concurrency=1)
+    runtimes.seed_run_times(True, [10] * 20)
+
+    self.assertAlmostEqual(runtimes.get_timeout(True, 1), 30)
+    self.assertAlmostEqual(runtimes.get_timeout(True, 4), 30)
+    self.assertEqual(runtimes.get_timeout(False, 4), 150)
+
+  def test_hung_runs_dont_raise_the_timeout(self):
+    # The runs that time out aren't recorded, only the ones that finish
+    rand = random.Random(1)
+    runtimes.seed_run_times(True, [10] * 20)
+    for _ in xrange(100):
+      if rand.random() >= 0.1:
+        runtimes.add_run_time(True, rand.uniform(9, 11))
+    self.assertLess(runtimes.get_timeout(True), 40)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,117 @@
+"""Tests of the keys and the timeouts of the test outcome cache."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import config
+from _evolution import testcache
+
+
+class Outcome():
+  """Stands in for a Tester that has made its runs"""
+
+  def __init__(self, runTimes, runTimeouts):
+    self.successes = len(runTimes)
+    self.timeouts = 0
+    self.dataraces = 0
+    self.deadlocks = 0
+    self.errors = 0
+    self.timedOut = 0
+    self.goodRuns = [True] * len(runTimes)
+    self.realTime = []
+    self.voluntarySwitches = []
+    self.involuntarySwitches = []
+    self.maxMemory = []
+    self.runTimes = runTimes
+    self.runTimeouts = runTimeouts
+
+
+class TestCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.saved = dict((name, getattr(config, name)) for name in
+                      ['_CACHE_DIR', '_PROJECT_SRC_DIR', '_PROJECT_TEST_DIR',
+                       '_CONTEST_ADAPTIVE_TIMEOUT'])
+    self.tmpDir = tempfile.mkdtemp()
+    config._CACHE_DIR = os.path.join(self.tmpDir, 'cache')
+    config._PROJECT_SRC_DIR = os.path.join(self.tmpDir, 'source')
+    config._PROJECT_TEST_DIR = os.path.join(self.tmpDir, 'test')
+    config._CONTEST_ADAPTIVE_TIMEOUT = True
+    self.write('source', 'Account.java', 'class Account {}')
+    self.write('test', 'AccountTest.java', 'class AccountTest {}')
+    testcache._connection = None
+
+  def tearDown(self):
+    if testcache._connection is not None:
+      testcache._connection.close()
+      testcache._connection = None
+    for name, value in self.saved.iteritems():
+      setattr(config, name, value)
+    shutil.rmtree(self.tmpDir)
+
+  def write(self, directory, name, text):
+    path = os.path.join(self.tmpDir, directory)
+    if not os.path.exists(path):
+      os.makedirs(path)
+    with open(os.path.join(path, name), 'w') as f:
+      f.write(text)
+
+  def key(self, functional=True, runs=10, **testOptions):
+    return testcache.generate_key(functional, False, runs, testOptions)
+
+  def test_same_project_same_key(self):
+    self.assertEqual(self.key(screening=True), self.key(screening=True))
+
+  def test_source_changes_key(self):
+    before = self.key()
+    self.write('source', 'Account.java', 'class Account { int balance; }')
+    self.assertNotEqual(before, self.key())
+
+  def test_test_set_changes_key(self):
+    before = self.key()
+    self.write('test', 'BankTest.java', 'class BankTest {}')
+    self.assertNotEqual(before, self.key())
+
+  def test_how_it_is_tested_changes_key(self):
+    self.assertNotEqual(self.key(), self.key(functional=False))
+    self.assertNotEqual(self.key(), self.key(runs=20))
+    self.assertNotEqual(self.key(), self.key(screening=True))
+
+  def test_no_project_no_key(self):
+    shutil.rmtree(config._PROJECT_TEST_DIR)
+    self.assertIsNone(self.key())
+
+  def test_finished_runs_must_fit_the_timeout(self):
+    outcome = {'runTimes': [10, 12], 'runTimeouts': [30, 30]}
+    self.assertTrue(testcache.is_valid(outcome, 12))
+    self.assertTrue(testcache.is_valid(outcome, 60))
+    self.assertFalse(testcache.is_valid(outcome, 11))
+
+  def test_timed_out_runs_need_no_more_time(self):
+    outcome = {'runTimes': [10, 30.5], 'runTimeouts': [30, 30]}
+    self.assertTrue(testcache.is_valid(outcome, 30))
+    self.assertTrue(testcache.is_valid(outcome, 20))
+    self.assertFalse(testcache.is_valid(outcome, 31))
+
+  def test_timed_out_outcome_is_kept(self):
+    key = self.key()
+    contest = Outcome([10, 30.5], [30, 30])
+    contest.successes = 1
+    contest.timeouts = 1
+    contest.timedOut = 1
+    contest.goodRuns[1] = False
+    testcache.add_outcome(key, contest)
+
+    found = Outcome([], [])
+    self.assertFalse(testcache.find_outcome(key, found, 45))
+    self.assertTrue(testcache.find_outcome(key, found, 25))
+    self.assertEqual(found.timeouts, 1)
+    self.assertEqual(found.timedOut, 1)
+    self.assertEqual(found.goodRuns, [True, False])
+    self.assertEqual(found.runTimeouts, [30, 30])
+
+
+if __name__ == '__main__':
+  unittest.main()
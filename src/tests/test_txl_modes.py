@@ -0,0 +1,136 @@
+"""Tests that the faster ways of running TXL write the same mutants.
+
+Compiled TXL programs (config._TXL_PRECOMPILE) and all the targets of a
+targeted operator in one command (config._TXL_BATCH_TARGETS) must generate
+exactly the mutants, numbering included, that the TXL source run once per
+target does. Both are off by default until these tests pass with the
+installed txl. Without txl, they are skipped.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from distutils.spawn import find_executable
+
+import config
+
+_TXL = find_executable('txl') is not None
+if _TXL:
+  from _evolution import hashlist
+  from _txl import txl_operator
+
+_TXL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        os.pardir, '_txl')
+
+_SOURCE = """public class Account {
+  private Object lock = new Object();
+  private Object other = new Object();
+  private int balance;
+  private int deposits;
+
+  public void deposit(int amount) {
+    synchronized (lock) {
+      balance += amount;
+    }
+    deposits++;
+  }
+
+  public synchronized int getBalance() {
+    return balance;
+  }
+
+  public void withdraw(int amount) {
+    synchronized (other) {
+      balance -= amount;
+    }
+  }
+}
+"""
+
+# Targeted operator => targeting arguments of each mutant
+_TARGETS = {
+  'ASAT_CV.Txl': [['-class', 'Account', '-var', var, '-syncvar', syncVar]
+                  for var in ['balance', 'deposits']
+                  for syncVar in ['lock', 'other']],
+  'ASAT_CMV.Txl': [['-class', 'Account', '-method', method, '-var', 'balance',
+                    '-syncvar', syncVar]
+                   for method in ['deposit', 'withdraw']
+                   for syncVar in ['lock', 'other']],
+  'ASM_CV.Txl': [['-class', 'Account', '-syncvar', syncVar]
+                 for syncVar in ['lock', 'other']],
+  'ASM_CMV.Txl': [['-class', 'Account', '-method', method, '-syncvar', 'lock']
+                  for method in ['deposit', 'getBalance', 'withdraw']],
+}
+
+# Operators that aren't targeted
+_OPERATORS = ['ASIM_RND.Txl', 'CSO.Txl', 'EXSA.Txl', 'EXSB.Txl', 'RSAS.Txl',
+              'RSAV.Txl', 'RSIM.Txl', 'RSM.Txl', 'SHSA.Txl', 'SHSB.Txl']
+
+
+@unittest.skipUnless(_TXL, "txl isn't installed")
+class TxlModesTest(unittest.TestCase):
+
+  def setUp(self):
+    self.saved = dict((name, getattr(config, name)) for name in
+                      ['_PROJECT_DIR', '_TXL_COMPILED_DIR', '_TXL_PRECOMPILE',
+                       '_TXL_BATCH_TARGETS'])
+    self.tmpDir = tempfile.mkdtemp()
+    config._PROJECT_DIR = self.tmpDir
+    config._TXL_COMPILED_DIR = os.path.join(self.tmpDir, 'compiled')
+    txl_operator._compiledPrograms.clear()
+
+    self.sourceFile = os.path.join(self.tmpDir, 'Account.java')
+    with open(self.sourceFile, 'w') as f:
+      f.write(_SOURCE)
+
+  def tearDown(self):
+    for name, value in self.saved.iteritems():
+      setattr(config, name, value)
+    txl_operator._compiledPrograms.clear()
+    shutil.rmtree(self.tmpDir)
+
+  def generate(self, txlFile, precompile, batch):
+    """ The mutants an operator writes, as {file name: hash} """
+
+    config._TXL_PRECOMPILE = precompile
+    config._TXL_BATCH_TARGETS = batch
+
+    destDir = tempfile.mkdtemp(dir=self.tmpDir) + os.sep
+    txlPath = os.path.join(_TXL_DIR, txlFile)
+    if txlFile in _TARGETS:
+      targets = [('Account_' + str(i + 1), targetArgs)
+                 for i, targetArgs in enumerate(_TARGETS[txlFile])]
+      commands = txl_operator.targeted_txl_commands(self.sourceFile, txlPath,
+                                                    destDir, targets)
+    else:
+      commands = [['txl', self.sourceFile, txlPath, '-', '-outfile',
+                   'Account_1', '-outdir', destDir]]
+    txl_operator.run_txl_commands(commands)
+
+    return dict((name, hashlist.hash_file(os.path.join(destDir, name)))
+                for name in os.listdir(destDir))
+
+  def test_batch_targets_write_the_same_mutants(self):
+    for txlFile in sorted(_TARGETS):
+      single = self.generate(txlFile, False, False)
+      self.assertTrue(single, "{} wrote no mutants".format(txlFile))
+      self.assertEqual(single, self.generate(txlFile, False, True), txlFile)
+
+  def test_compiled_programs_write_the_same_mutants(self):
+    for txlFile in sorted(_TARGETS) + _OPERATORS:
+      self.assertEqual(self.generate(txlFile, False, False),
+                       self.generate(txlFile, True, False), txlFile)
+      # They are actually compiled
+      self.assertNotEqual(txl_operator._compiledPrograms[
+                          os.path.join(_TXL_DIR, txlFile)],
+                          os.path.join(_TXL_DIR, txlFile), txlFile)
+
+  def test_both_write_the_same_mutants(self):
+    for txlFile in sorted(_TARGETS):
+      self.assertEqual(self.generate(txlFile, False, False),
+                       self.generate(txlFile, True, True), txlFile)
+
+
+if __name__ == '__main__':
+  unittest.main()